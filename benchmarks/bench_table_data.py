@@ -0,0 +1,156 @@
+"""
+Measures how many QTableModel.data() calls per second we can serve for the
+roles a QTableView requests while painting a screen of cells - with the
+compiled per-column role handlers, and with the former if/elif dispatch on
+the role as the baseline.
+
+Usage:
+
+    python benchmarks/bench_table_data.py [n_rows] [n_repeats]
+
+It runs under the offscreen Qt platform, so it does not need a display.
+"""
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from qtpy.QtCore import Qt
+from qtpy.QtGui import QColor
+from qtpy.QtWidgets import QApplication
+
+from enamlext.qt.qtable import QTableModel, to_qt_alignment
+from enamlext.qt.table.column import Column, Alignment, AUTO_ALIGN, MIXED_ALIGN
+from enamlext.qt.table.defs import CellStyle
+
+
+# what a QTableView (QStyledItemDelegate) asks for when painting a cell
+PAINT_ROLES = [
+    Qt.SizeHintRole,
+    Qt.FontRole,
+    Qt.TextAlignmentRole,
+    Qt.ForegroundRole,
+    Qt.CheckStateRole,
+    Qt.DecorationRole,
+    Qt.DisplayRole,
+    Qt.BackgroundRole,
+]
+
+
+@dataclass
+class Order:
+    symbol: str
+    side: str
+    price: float
+    quantity: int
+    trader: str
+
+
+RED = CellStyle(color=QColor(Qt.red))
+
+
+def negative_in_red(table_context):
+    if table_context.raw_value < 0:
+        return RED
+
+
+class IfElifTableModel(QTableModel):
+    """ The baseline: data() resolves the column and tests the role on every call, the way it
+    did before the role handlers were compiled (with the same helpers answering each role).
+    """
+
+    def data(self, index, role):
+        if not index.isValid():
+            return None
+        column = self.get_column_by_index(index.column())
+        if column is not None and column.collect_stats:
+            t0 = time.perf_counter()
+            result = self._if_elif_data(index, role)
+            column.record_stats(role=role, elapsed=time.perf_counter() - t0)
+            return result
+        return self._if_elif_data(index, role)
+
+    def _if_elif_data(self, index, role):
+        col_index = index.column()
+        if self.checkable and col_index == 0:
+            if role == Qt.CheckStateRole:
+                return self._check_state_data(index)
+            elif role == Qt.FontRole:
+                return self._font
+            return None
+        column = self.get_column_by_index(col_index)
+        if role == Qt.DisplayRole:
+            if getattr(column, 'df_index', None) is not None and not callable(column.fmt):
+                return self._columnar_display_data(col_index, column, index)
+            return self._display_data(col_index, column, index)
+        elif role == Qt.TextAlignmentRole:
+            if column.align is MIXED_ALIGN:
+                return self._cell_alignment_data(col_index, column, index)
+            elif column.align is AUTO_ALIGN:
+                return self._column_alignment_data(col_index, column, index)
+            return to_qt_alignment(column.align)
+        elif role == Qt.ToolTipRole:
+            return self._tooltip_data(col_index, column, index)
+        elif role == Qt.FontRole:
+            if column.cell_style is not None:
+                return self._font_data(col_index, column, index)
+            return self._font
+        elif role == Qt.ForegroundRole:
+            if column.cell_style is not None:
+                return self._style_data('color', col_index, column, index)
+        elif role == Qt.BackgroundColorRole:
+            if column.cell_style is not None:
+                return self._style_data('background', col_index, column, index)
+        elif role == Qt.DecorationRole:
+            if column.image is not None:
+                return self._decoration_data(col_index, column, index)
+        return None
+
+
+def make_model(n_rows: int, model_class=QTableModel) -> QTableModel:
+    items = [Order(symbol=f'SYM{i % 50}', side='BUY' if i % 2 else 'SELL',
+                   price=(i % 17 - 8) * 1.25, quantity=i * 100, trader='jdoe')
+             for i in range(n_rows)]
+    columns = [
+        Column('symbol'),
+        Column('side', align=Alignment.CENTER),
+        Column('price', fmt=',.2f', cell_style=negative_in_red),
+        Column('quantity', fmt=','),
+        Column('trader'),
+    ]
+    return model_class(columns, items)
+
+
+def bench(model: QTableModel, n_repeats: int) -> float:
+    indexes = [model.index(row, col)
+               for row in range(model.rowCount())
+               for col in range(model.columnCount())]
+    data = model.data
+    n_calls = 0
+    t0 = time.perf_counter()
+    for _ in range(n_repeats):
+        for index in indexes:
+            for role in PAINT_ROLES:
+                data(index, role)
+        n_calls += len(indexes) * len(PAINT_ROLES)
+    elapsed = time.perf_counter() - t0
+    return n_calls / elapsed
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n_repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    app = QApplication.instance() or QApplication([])
+    baseline_model = make_model(n_rows, IfElifTableModel)
+    model = make_model(n_rows)
+    print(f'{n_rows} rows x {model.columnCount()} columns x {len(PAINT_ROLES)} roles, {n_repeats} repeats')
+    baseline = bench(baseline_model, n_repeats)
+    print(f'if/elif dispatch (baseline): {baseline:,.0f} calls/s')
+    calls_per_second = bench(model, n_repeats)
+    print(f'compiled role handlers:      {calls_per_second:,.0f} calls/s ({calls_per_second / baseline:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,99 +1,910 @@
 import logging
+import re
 import threading
-from typing import Callable
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, List
 
 import time
 import numpy as np
 import pandas as pd
+from qtpy.QtCore import QCoreApplication, QObject, Signal, Slot
+
+from enamlext.qt.table.metrics import TickMetricsRecorder
 
 
 logger = logging.getLogger(__name__)
 
+# format specs that mean the same thing for format() and for the printf-style % operator
+_PRINTF_COMPATIBLE_SPEC = re.compile(r'^[+ ]?0?\d*(\.\d+)?(?P<type>[dfeEgG])$')
 
-def _monitor_df_changes(df_proxy):
-    if df_proxy.instrumentation_enabled:
-        logger.info('Starting DataFrameProxy thread for monitoring changes and refreshing ticking cells '
-                    f'{threading.current_thread()}')
-    
-    from enaml.application import deferred_call
 
-    current_values = df_proxy.values
-    interval = df_proxy.tick_interval_ms / 1_000
+def format_values(values: np.ndarray, fmt: str) -> List[str]:
+    """ Formats a 1-D array of values in one go, returning the same strings as
+    format(value, fmt) would (and '' for None) for each value.
+    """
+    kind = values.dtype.kind
+    if kind in 'iuf' and (match := _PRINTF_COMPATIBLE_SPEC.match(fmt)) is not None:
+        if match['type'] != 'd' or kind in 'iu':
+            return np.char.mod(f'%{fmt}', values).tolist()
 
-    while df_proxy.is_active():
-        time.sleep(interval)
+    if kind in 'iu' or (kind == 'f' and values.dtype.itemsize == 8):
+        values = values.tolist()  # builtin scalars are much cheaper to format than numpy ones
 
-        if df_proxy.instrumentation_enabled:
-            t0 = time.perf_counter()
+    return [format(value, fmt) if value is not None else '' for value in values]
 
-        new_values = df_proxy.df.values.copy()
 
-        row_indexes, col_indexes = np.where(~((current_values == new_values) | (pd.isna(current_values) & pd.isna(new_values))))
+class _ColumnGroup:
+    """ Columns of a frame that are diffed together, using the cheapest comparison
+    their dtype allows:
 
-        if len(row_indexes):
-            deferred_call(df_proxy.update_values_and_refresh_cells, new_values, row_indexes, col_indexes)
+        'float'    - native comparison, NaN == NaN
+        'exact'    - native comparison (ints, unsigned, bools)
+        'datetime' - comparison of the int64 representation (NaT == NaT)
+        'category' - comparison of the category codes (one column per group)
+        'object'   - element-wise comparison of the boxed values, NaN == NaN
+
+    The values are read into preallocated (column-major) buffers: the front buffer
+    holds the last snapshot and the back buffer the values being compared to it,
+    and they are swapped after each diff. Except for 'object' groups, comparisons
+    write into preallocated masks too, so a diff does not allocate anything in
+    proportion to the size of the frame (only to the number of changed cells).
+    """
+
+    def __init__(self, kind: str, positions: List[int], dtype: np.dtype):
+        self.kind = kind
+        self.positions = np.asarray(positions, dtype=np.intp)
+        self.dtype = dtype
+        self.front = self.back = None
+        self.mask = self.scratch = None
+        self.categories = None
+        self.all_changed = False  # e.g. the categories changed: codes are not comparable
+
+    def allocate(self, n_rows: int) -> None:
+        shape = (n_rows, len(self.positions))
+        self.front = np.empty(shape, dtype=self.dtype, order='F')
+        self.back = np.empty(shape, dtype=self.dtype, order='F')
+        self.mask = np.empty(shape, dtype=bool, order='F')
+        if self.kind == 'float':
+            self.scratch = np.empty(shape, dtype=bool, order='F'), np.empty(shape, dtype=bool, order='F')
+
+    def read(self, df: pd.DataFrame) -> None:
+        """ Copies the current values of the columns into the back buffer. """
+        if self.kind == 'category':
+            series = df.iloc[:, self.positions[0]]
+            codes = series.cat.codes.to_numpy()
+            if self.categories is not None and not series.cat.categories.equals(self.categories):
+                self.all_changed = True
+                if codes.dtype != self.dtype:  # more categories may need wider codes
+                    self.dtype = codes.dtype
+                    self.allocate(len(codes))
+            self.categories = series.cat.categories
+            np.copyto(self.back[:, 0], codes)
+        elif len(self.positions) == df.shape[1]:
+            np.copyto(self.back, df.to_numpy())  # a view of the frame's data when it is a single block
+        else:
+            for i, position in enumerate(self.positions.tolist()):
+                np.copyto(self.back[:, i], df.iloc[:, position].to_numpy())
+
+    def changed(self) -> np.ndarray:
+        """ Returns the mask of the cells that differ between the front and back buffers. """
+        old, new, mask = self.front, self.back, self.mask
+        if self.kind == 'float':
+            both_nan, new_nan = self.scratch
+            np.not_equal(old, new, out=mask)
+            np.isnan(old, out=both_nan)
+            np.isnan(new, out=new_nan)
+            np.logical_and(both_nan, new_nan, out=both_nan)
+            np.logical_not(both_nan, out=both_nan)
+            np.logical_and(mask, both_nan, out=mask)
+        elif self.kind == 'datetime':
+            np.not_equal(old.view('i8'), new.view('i8'), out=mask)
+        elif self.kind == 'object':
+            mask[...] = ~((old == new) | (pd.isna(old) & pd.isna(new)))
+        else:
+            np.not_equal(old, new, out=mask)
+        return mask
+
+    def values_at(self, rows: np.ndarray, group_cols: np.ndarray) -> np.ndarray:
+        """ Returns the new (boxed like in DataFrame.values) values of the given cells. """
+        if self.kind == 'category':
+            codes = self.back[rows, 0]
+            categories = self.categories.to_numpy(dtype=object)
+            return np.where(codes >= 0, categories[codes], np.nan)
+        elif self.kind == 'datetime':
+            return pd.Index(self.back[rows, group_cols]).astype(object).to_numpy()
+        else:
+            return self.back[rows, group_cols]
+
+    def swap(self) -> None:
+        self.front, self.back = self.back, self.front
+
+
+def _group_columns(df: pd.DataFrame) -> List[_ColumnGroup]:
+    by_dtype = {}
+    groups = []
+    for position, dtype in enumerate(df.dtypes):
+        if isinstance(dtype, pd.CategoricalDtype):
+            codes_dtype = df.iloc[:, position].cat.codes.dtype
+            groups.append(_ColumnGroup('category', [position], codes_dtype))
+            continue
+        if not isinstance(dtype, np.dtype):
+            kind = 'object'  # extension dtypes (tz-aware datetimes, nullable ints, strings...)
+        elif dtype.kind == 'f':
+            kind = 'float'
+        elif dtype.kind in 'iub':
+            kind = 'exact'
+        elif dtype.kind in 'mM':
+            kind = 'datetime'
+        else:
+            kind = 'object'
+        by_dtype.setdefault((kind, str(dtype)), (dtype if kind != 'object' else np.dtype(object), []))[1].append(position)
+
+    groups.extend(_ColumnGroup(kind, positions, dtype) for (kind, _), (dtype, positions) in by_dtype.items())
+    return groups
+
+
+class FrameStructureChanged(Exception):
+    """ Raised by FrameChangeDetector.detect() when the shape or the dtypes of the frame changed,
+    i.e. its cells cannot be refreshed one by one anymore.
+    """
+
+
+class FrameChangeDetector:
+    """ Finds which cells of a DataFrame changed between consecutive calls of detect().
+
+    Columns are diffed per dtype group, so the cost of a diff is driven by the native
+    (numeric) data: only object columns are compared as boxed Python objects, and
+    categorical columns are compared through their integer codes. The buffers used
+    are allocated once (and again only if the structure of the frame changes).
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._take_snapshot()
+
+    def _take_snapshot(self):
+        self.shape = self.df.shape
+        self.dtypes = self.df.dtypes
+        self.groups = _group_columns(self.df)
+        for group in self.groups:
+            group.allocate(len(self.df))
+            group.read(self.df)
+            group.swap()
+
+    def detect(self):
+        """ Returns (row indexes, column indexes, new values) of the cells that changed. """
+        df = self.df
+        if df.shape != self.shape or not df.dtypes.equals(self.dtypes):
+            previous_shape = self.shape
+            self._take_snapshot()  # the next changes are looked for in the new structure
+            raise FrameStructureChanged(f'DataFrame structure changed from {previous_shape} to {df.shape}')
+
+        all_rows, all_cols, all_values = [], [], []
+        for group in self.groups:
+            group.read(df)
+            if group.all_changed:
+                mask = group.mask
+                mask.fill(True)
+                group.all_changed = False
+            else:
+                mask = group.changed()
+            if mask.any():
+                rows, group_cols = np.nonzero(mask)
+                all_rows.append(rows)
+                all_cols.append(group.positions[group_cols])
+                all_values.append(group.values_at(rows, group_cols))
+            group.swap()
+
+        if not all_rows:
+            return _NO_CHANGES
+        elif len(all_rows) == 1:
+            return all_rows[0], all_cols[0], all_values[0]
+        else:
+            return (np.concatenate(all_rows), np.concatenate(all_cols),
+                    np.concatenate([values.astype(object) for values in all_values]))
+
+
+# share of the main thread's time that applying ticking updates may take before the tick interval grows
+MAX_TICK_LOAD = 0.5
+
+# weight of the latest sample in the moving averages of TickPacer
+TICK_PACER_SMOOTHING = 0.2
+
+# by default the adapted tick interval is not bounded (see TickPacer)
+DEFAULT_MAX_STALENESS_MS = None
+
+_NO_CHANGES = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=object))
+
+
+class CellUpdates:
+    """ Thread-safe queue of cell updates waiting to be applied in the main thread.
+
+    Updates are conflated per cell: when a cell is updated several times before
+    the queue is drained, only its latest value is kept.
+    """
+
+    def __init__(self, n_columns: int):
+        self.n_columns = n_columns
+        self._lock = threading.Lock()
+        self._chunks = []
+        self._n_cells = 0  # queued cells, before conflation
+        self.queued_since = None  # perf_counter() of the oldest update still queued
+        self.taken_batches = 0  # number of put() conflated by the last take()
+
+    def __len__(self) -> int:
+        return self._n_cells
+
+    def put(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> bool:
+        """ Queues the updates, returning True if the queue was empty (i.e. a delivery must be scheduled). """
+        with self._lock:
+            was_empty = not self._chunks
+            if was_empty:
+                self.queued_since = time.perf_counter()
+            self._chunks.append((row_indexes, col_indexes, values))
+            self._n_cells += len(row_indexes)
+        return was_empty
+
+    def take(self):
+        """ Drains the queue, returning the conflated (row indexes, column indexes, values). """
+        with self._lock:
+            chunks, self._chunks = self._chunks, []
+            self._n_cells = 0
+            self.queued_since = None
+        self.taken_batches = len(chunks)
+        if not chunks:
+            return _NO_CHANGES
+
+        row_indexes = np.concatenate([rows for rows, _, _ in chunks])
+        col_indexes = np.concatenate([cols for _, cols, _ in chunks])
+        if len({values.dtype for _, _, values in chunks}) == 1:
+            values = np.concatenate([values for _, _, values in chunks])
+        else:  # do not let numpy promote e.g. ints and strs to a common (str) dtype
+            values = np.concatenate([values.astype(object) for _, _, values in chunks])
 
-        current_values = new_values
+        # keep the last update of each cell (np.unique returns the first occurrence, hence the reversal)
+        keys = row_indexes * self.n_columns + col_indexes
+        _, first_in_reversed = np.unique(keys[::-1], return_index=True)
+        latest = len(keys) - 1 - first_in_reversed
+        return row_indexes[latest], col_indexes[latest], values[latest]
+
+
+class TickPacer:
+    """ Adapts the tick interval of a proxy to how fast the main thread applies its updates.
+
+    The interval grows when applying the updates takes a significant share of the
+    main thread's time (MAX_TICK_LOAD) or when deliveries are late, and shrinks back
+    to the requested interval once the main thread keeps up. It never grows beyond
+    what max_staleness_ms allows (if given), i.e. interval + delivery latency <= max
+    staleness - unless the main thread alone is already slower than that, and never
+    below the requested interval (a max staleness shorter than it is clamped to it).
+    """
+
+    def __init__(self, interval_ms: int, max_staleness_ms: int | None = None):
+        self.base_interval = interval_ms / 1_000
+        self.max_staleness = max_staleness_ms / 1_000 if max_staleness_ms is not None else None
+        self.apply_time = 0.0  # moving average of the time spent applying a batch in the main thread
+        self.latency = 0.0  # moving average of the time from queuing an update to it being applied
+        self.n_deliveries = 0
+
+    def record_delivery(self, queued_since: float, apply_time: float) -> None:
+        latency = time.perf_counter() - queued_since
+        if self.n_deliveries:
+            self.apply_time += TICK_PACER_SMOOTHING * (apply_time - self.apply_time)
+            self.latency += TICK_PACER_SMOOTHING * (latency - self.latency)
+        else:
+            self.apply_time, self.latency = apply_time, latency
+        self.n_deliveries += 1
+
+    @property
+    def interval(self) -> float:
+        """ Seconds to wait before looking for the next changes. """
+        wanted = max(self.base_interval, self.apply_time / MAX_TICK_LOAD, self.latency)
+        if self.max_staleness is None:
+            return wanted
+        return min(wanted, max(self.base_interval, self.max_staleness - self.latency))
+
+
+class _DeliveryRelay(QObject):
+    """ Lives in the GUI thread: emitting deliver (from any thread) runs the deliveries there. """
+
+    deliver = Signal()
+
+    def __init__(self, scheduler: 'TickScheduler', thread):
+        super().__init__()
+        self.scheduler = scheduler
+        self.moveToThread(thread)
+        self.deliver.connect(self._on_deliver)  # queued when emitted from another thread
+
+    @Slot()
+    def _on_deliver(self) -> None:
+        self.scheduler._deliver()
+
+
+class TickScheduler:
+    """ Polls all the ticking proxies for changes from a single (daemon) thread.
+
+    Wakeups are aligned on a grid of each proxy's interval, so proxies ticking at the
+    same rate (or at multiples of it) are diffed together, and the updates of all the
+    proxies (polled or pushed) are delivered to the main thread in one queued call,
+    i.e. in one go before the next repaint. The thread only runs while there are
+    ticking proxies. Updates are only ever applied in the GUI thread: without a Qt
+    application they are held until there is one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._ticking = {}  # DataFrameProxy -> [FrameChangeDetector, next due perf_counter()]
+        self._to_deliver = {}  # DataFrameProxy -> None (an ordered set)
+        self._delivery_scheduled = False
+        self._relay = None  # _DeliveryRelay, made once there is a Qt application
+
+    def register(self, df_proxy: 'DataFrameProxy') -> None:
+        detector = FrameChangeDetector(df_proxy.df)
+        with self._lock:
+            self._ticking[df_proxy] = [detector, self._next_due(df_proxy.pacer.interval)]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='TickScheduler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def unregister(self, df_proxy: 'DataFrameProxy') -> None:
+        with self._lock:
+            self._ticking.pop(df_proxy, None)
+        self._wakeup.set()
+
+    def __contains__(self, df_proxy: 'DataFrameProxy') -> bool:
+        return df_proxy in self._ticking
+
+    def rates(self) -> Dict['DataFrameProxy', float]:
+        """ Deliveries per second of each ticking proxy (over the last few seconds). """
+        with self._lock:
+            proxies = list(self._ticking)
+        return {df_proxy: df_proxy._recorder.ticks_per_second for df_proxy in proxies}
+
+    @staticmethod
+    def _next_due(interval: float) -> float:
+        return (time.perf_counter() // interval + 1) * interval
+
+    def _run(self) -> None:
+        logger.debug(f'Starting the tick scheduler thread {threading.current_thread()}')
+        while True:
+            self._wakeup.clear()
+            with self._lock:
+                if not self._ticking:
+                    self._thread = None
+                    break
+                now = time.perf_counter()
+                due = [(df_proxy, state) for df_proxy, state in self._ticking.items() if state[1] <= now]
+                for df_proxy, state in due:
+                    state[1] = self._next_due(df_proxy.pacer.interval)
+                timeout = min(state[1] for state in self._ticking.values()) - now
+
+            for df_proxy, (detector, _) in due:
+                self._tick(df_proxy, detector)
+
+            self._wakeup.wait(max(timeout, 0.0))
+        logger.debug(f'Tick scheduler thread stopped {threading.current_thread()}')
+
+    def _tick(self, df_proxy: 'DataFrameProxy', detector: FrameChangeDetector) -> None:
+        if len(df_proxy.pending_updates):
+            # the main thread has not applied the previous changes yet: rather than competing with it
+            # for the GIL, skip this tick - its changes are picked up (conflated) by the next diff
+            df_proxy._recorder.conflated_ticks += 1
+            self.schedule_delivery(df_proxy)  # in case they are held (no Qt application yet)
+            return
+
+        t0 = time.perf_counter()
+        try:
+            row_indexes, col_indexes, values = detector.detect()
+        except FrameStructureChanged as ex:
+            df_proxy.post_structure_change(str(ex))
+            return
+        except Exception:
+            logger.exception('Error when looking for changes of a ticking DataFrame - it stops ticking')
+            self.unregister(df_proxy)
+            return
+
+        elapsed = time.perf_counter() - t0
+        df_proxy._recorder.record_diff(elapsed)
+
+        if len(row_indexes):
+            df_proxy.post_updates(row_indexes, col_indexes, values)
 
         if df_proxy.instrumentation_enabled:
-            elapsed = time.perf_counter() - t0
-            logger.info(f'It took {elapsed:.3f} s inside the monitoring thread')
+            logger.info(f'It took {elapsed:.3f} s inside the tick scheduler thread looking for changes')
+
+    def schedule_delivery(self, df_proxy: 'DataFrameProxy') -> None:
+        """ Delivers the pending updates of the proxy to the main thread, along with the ones
+        of any other proxy scheduled before the main thread gets to it.
+        """
+        with self._lock:
+            self._to_deliver[df_proxy] = None
+            if self._delivery_scheduled or (relay := self._delivery_relay()) is None:
+                return  # already on its way, or held until there is a Qt application
+            self._delivery_scheduled = True
+        relay.deliver.emit()
+
+    def _delivery_relay(self) -> '_DeliveryRelay | None':
+        if self._relay is None and (app := QCoreApplication.instance()) is not None:
+            self._relay = _DeliveryRelay(self, app.thread())
+        return self._relay
+
+    def _deliver(self) -> None:
+        with self._lock:
+            to_deliver, self._to_deliver = self._to_deliver, {}
+            self._delivery_scheduled = False
+        for df_proxy in to_deliver:
+            df_proxy._deliver_updates()
+
+
+# shared by all the proxies (unless given their own)
+tick_scheduler = TickScheduler()
+
+
+def _column_array(series: pd.Series, copy: bool = False) -> np.ndarray:
+    """ Values of one column: a view on the frame's block for native dtypes (unless copy
+    is set), boxed like in DataFrame.values for datetimes and extension dtypes.
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'mM':
+        return series.to_numpy(dtype=object)
+    return series.to_numpy(copy=copy)
 
-    if df_proxy.instrumentation_enabled:
-        logger.info(f'Thread died: DataFrameProxy ticking monitor {threading.current_thread()}')
+
+def _fit_column(column: np.ndarray, values: np.ndarray):
+    """ Returns (column, values) ready for column[...] = values: the column itself, or
+    a copy upcast when the values do not fit in its dtype without loss.
+    """
+    if column.dtype == object:
+        return column, values
+    if values.dtype == object:
+        values = np.array(values.tolist())  # e.g. the values of columns of several dtypes
+    if np.can_cast(values.dtype, column.dtype, casting='same_kind'):
+        return column, values
+    if column.dtype.kind in 'biuf' and values.dtype.kind in 'biuf':
+        return column.astype(np.result_type(column.dtype, values.dtype)), values
+    return column.astype(object), values
+
+
+def _buffer_dtype(dtype) -> np.dtype:
+    """ dtype of a preallocated column buffer for a column of the given dtype (boxed like
+    _column_array() for datetimes and extension dtypes).
+    """
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if not isinstance(dtype, np.dtype) or dtype.kind in 'mM':
+        return np.dtype(object)
+    return dtype
+
+
+def _by_column(col_indexes: np.ndarray):
+    """ Yields (column index, positions in col_indexes) for each column in col_indexes. """
+    if not len(col_indexes):
+        return
+    if (col_indexes == col_indexes[0]).all():
+        yield int(col_indexes[0]), slice(None)
+        return
+    order = np.argsort(col_indexes, kind='stable')
+    cols, starts = np.unique(col_indexes[order], return_index=True)
+    yield from zip(cols.tolist(), np.split(order, starts[1:]))
+
+
+class DataFrameProxyRow(Sequence):
+    """ One row of a DataFrameProxy, reading its values straight from the columns of the
+    proxy (so it always sees the latest values, and building one copies nothing).
+    """
+    __slots__ = ('_columns', '_position')
+
+    def __init__(self, columns: List[np.ndarray], position: int):
+        self._columns = columns
+        self._position = position
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return [column[self._position] for column in self._columns[col]]
+        return self._columns[col][self._position]
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({list(self)!r})'
+
+
+class DataFrameRow(Mapping):
+    """ Read-only view of one row of a DataFrameProxy, keyed by column name.
+
+    It is what DataFrame tables hand to callbacks as the converted item: building
+    one is O(1) and does not copy the row (unlike building a dict of it).
+    """
+    __slots__ = ('_positions', '_values')
+
+    def __init__(self, positions: Dict[Any, int], values: Sequence):
+        self._positions = positions
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._positions[key]]
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self)!r})'
 
 
 class DataFrameProxy:
+    """ Table items backed by a DataFrame.
+
+    The values are kept per column (column_values), as views on the frame's blocks when
+    the proxy is not live, so memory and conversions stay proportional to the native
+    dtypes: rows are only handed out as DataFrameProxyRow views on those columns.
+    """
+
     def __init__(self,
                  df: pd.DataFrame,
                  *,
                  tick_interval_ms: int = 0,
                  refresh_cells_callback: Callable[[list, list], None] | None = None,
+                 structure_changed_callback: Callable[[], None] | None = None,
+                 max_staleness_ms: int | None = DEFAULT_MAX_STALENESS_MS,
+                 scheduler: TickScheduler | None = None,
                  instrumentation_enabled: bool = False):
         if tick_interval_ms > 0 and refresh_cells_callback is None:
             raise ValueError('You must pass a callback to handle refreshing cells when you pass '
                              'a tick_interval_ms > 0.')
-        if tick_interval_ms <= 0 and refresh_cells_callback is not None:
-            raise ValueError('You should specify a tick_interval_ms refresh interval in miliseconds when you '
-                             'pass a refresh_cells_callback.')
-        self.values = df.values
+        # ticking proxies get their own copy of the values (their frame is modified in place), updated in the
+        # main thread with the changed cells; the others read the frame's memory until their first update (see
+        # update_cells) - in place, so the rows handed out (e.g. to sorted and filtered views) see the latest values
+        self._owns_values = tick_interval_ms > 0
         self.df = df
+        self.column_values = []
+        self._load_values()
         self.tick_interval_ms = tick_interval_ms
         self.refresh_cells_callback = refresh_cells_callback
+        # called (in the main thread) once the values were reloaded after the frame changed shape or dtypes
+        # while ticking - the views must be reset then (without it, the proxy stops ticking)
+        self.structure_changed_callback = structure_changed_callback
+        self._structure_change = None  # why the values must be reloaded (set by the scheduler thread)
         self.instrumentation_enabled = instrumentation_enabled
         self._is_active = True
+        self._recorder = TickMetricsRecorder()
+        self.metrics = self._recorder.metrics  # observable, see TickMetrics
+        self._awaiting_repaint = None  # perf_counter() of the oldest update not repainted yet
+        self.change_times = None  # see enable_change_tracking()
+        self.change_directions = None
+        self.last_change_time = -np.inf
+        self.pacer = TickPacer(tick_interval_ms, max_staleness_ms)
+        self.scheduler = scheduler if scheduler is not None else tick_scheduler
         if self.is_ticking:
-            import threading
-            t = threading.Thread(target=_monitor_df_changes,
-                                 args=(self,),
-                                 daemon=True)
-            t.start()
+            self.scheduler.register(self)
+
+    def _load_values(self) -> None:
+        df = self.df
+        # in place, so the rows handed out before see the new columns too
+        self.column_values[:] = [_column_array(df.iloc[:, i], copy=self._owns_values) for i in range(df.shape[1])]
+        self._capacity = len(df)  # rows that fit in the column arrays
+        self._column_positions = {name: i for i, name in enumerate(df.columns.values)}
+        self.pending_updates = CellUpdates(df.shape[1])
+
+    def apply_updates(self, row_indexes, col_indexes, values) -> None:
+        """ Pushes new values for the given cells (positional indexes into the frame).
+
+        This can be called from any thread: the updates are queued, conflated with
+        the ones not yet delivered and applied in the main thread. Only the values
+        displayed are updated, the DataFrame itself is not modified.
+        """
+        row_indexes = np.asarray(row_indexes, dtype=np.intp).ravel()
+        col_indexes = np.asarray(col_indexes, dtype=np.intp).ravel()
+        if len(row_indexes) != len(col_indexes):
+            raise ValueError(f'Got {len(row_indexes)} row indexes but {len(col_indexes)} column indexes')
+        if not isinstance(values, np.ndarray):
+            values = np.asarray(values, dtype=object)  # fitted to the dtype of each column when written
+        values = np.broadcast_to(values, row_indexes.shape)
+
+        n_rows, n_columns = len(self), len(self._column_positions)
+        if len(row_indexes) and (row_indexes.min() < 0 or row_indexes.max() >= n_rows
+                                 or col_indexes.min() < 0 or col_indexes.max() >= n_columns):
+            raise IndexError(f'Cell updates out of the bounds of the DataFrame (shape: {(n_rows, n_columns)})')
+
+        self.post_updates(row_indexes, col_indexes, values)
+
+    def apply_updates_by_label(self, index_labels, column_labels, values) -> None:
+        """ Same as apply_updates(), but the cells are given by their index and column labels. """
+        row_indexes = self.index.get_indexer(index_labels)
+        col_indexes = self.df.columns.get_indexer(column_labels)
+        if (row_indexes < 0).any():
+            raise KeyError(f'Unknown index labels: {list(np.asarray(index_labels)[row_indexes < 0])}')
+        if (col_indexes < 0).any():
+            raise KeyError(f'Unknown column labels: {list(np.asarray(column_labels)[col_indexes < 0])}')
+        self.apply_updates(row_indexes, col_indexes, values)
+
+    def post_updates(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> None:
+        """ Queues already validated updates, scheduling their delivery to the main thread if needed. """
+        if self.pending_updates.put(row_indexes, col_indexes, values):
+            self.scheduler.schedule_delivery(self)
+
+    def post_structure_change(self, reason: str) -> None:
+        """ Schedules reloading the values (in the main thread) after the frame changed shape or dtypes. """
+        self._structure_change = reason
+        self.scheduler.schedule_delivery(self)
+
+    def _reload_structure(self, reason: str) -> None:
+        if self.structure_changed_callback is None:
+            logger.error(f'{reason} while ticking - the DataFrameProxy stops ticking (pass a '
+                         f'structure_changed_callback to reset the views and keep ticking)')
+            self.scheduler.unregister(self)
+            return
+        logger.info(f'{reason} while ticking - reloading the values')
+        self._load_values()
+        if self.change_times is not None:
+            self.change_times = None
+            self.enable_change_tracking()
+        self.structure_changed_callback()
+
+    def _deliver_updates(self) -> None:
+        if (reason := self._structure_change) is not None:
+            self._structure_change = None
+            self.pending_updates.take()  # cells of the previous structure
+            if self.is_active():
+                self._reload_structure(reason)
+            return
+        queued_since = self.pending_updates.queued_since
+        row_indexes, col_indexes, values = self.pending_updates.take()
+        if not len(row_indexes):
+            return
+        recorder = self._recorder
+        if not self.is_active():
+            recorder.dropped_ticks += 1
+            return
+
+        recorder.conflated_ticks += self.pending_updates.taken_batches - 1
+        t0 = time.perf_counter()
+        self._apply_delivered(row_indexes, col_indexes, values)
+        elapsed = time.perf_counter() - t0
+        self.pacer.record_delivery(queued_since, elapsed)
+        recorder.record_delivery(len(row_indexes), elapsed)
+        if self._awaiting_repaint is None:
+            self._awaiting_repaint = queued_since
+        recorder.publish()
+
+    def record_repaint(self) -> None:
+        """ To be called (in the main thread) when the views showing the proxy have been
+        repainted, to measure the latency of the updates delivered since the last repaint.
+        """
+        if self._awaiting_repaint is not None:
+            self._recorder.record_latency(time.perf_counter() - self._awaiting_repaint)
+            self._awaiting_repaint = None
+            self._recorder.publish()
+
+    def _apply_delivered(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> None:
+        self.update_cells(row_indexes, col_indexes, values)
 
     def update_values_and_refresh_cells(self, new_values, row_indexes, col_indexes):
+        """ Takes the values of the given (changed) cells from new_values - all the values of
+        the frame, as in DataFrame.values - and refreshes them. Must be called in the main thread.
+        """
+        row_indexes = np.asarray(row_indexes, dtype=np.intp)
+        col_indexes = np.asarray(col_indexes, dtype=np.intp)
+        self.update_cells(row_indexes, col_indexes, np.asarray(new_values)[row_indexes, col_indexes])
+
+    def update_cells(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> None:
         # must be called in the main thread!
         if self.instrumentation_enabled:
             t0 = time.perf_counter()
 
-        self.values = new_values
-        self.refresh_cells_callback(row_indexes, col_indexes)
+        if not self._owns_values:  # never write into the DataFrame's own memory (in place: rows refer to the list)
+            self.column_values[:] = [column.copy() for column in self.column_values]
+            self._owns_values = True
+
+        if self.change_times is not None:
+            self._record_changes(row_indexes, col_indexes, values)
+        self._write_values(row_indexes, col_indexes, values)
+        if self.refresh_cells_callback is not None:
+            self.refresh_cells_callback(row_indexes, col_indexes)
 
         if self.instrumentation_enabled:
             elapsed = time.perf_counter() - t0
             changed_col_names = {i: self.df.columns[i] for i in set(col_indexes)}
             logger.info(f'It took {elapsed:.3f} s inside the main thread refreshing {len(row_indexes)} cells - modified cols: {changed_col_names}')
 
+    def _row_positions(self, row_indexes) -> np.ndarray:
+        """ Positions in the column arrays of the given rows. """
+        return np.asarray(row_indexes, dtype=np.intp)
+
+    def _write_values(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> None:
+        positions = self._row_positions(row_indexes)
+        for col, selection in _by_column(col_indexes):
+            self._write_column(col, positions[selection], values[selection])
+
+    def _write_column(self, col: int, positions: np.ndarray, values: np.ndarray) -> None:
+        column, values = _fit_column(self.column_values[col], values)
+        self.column_values[col] = column
+        column[positions] = values
+
+    @property
+    def index(self) -> pd.Index:
+        """ Index labels of the rows. """
+        return self.df.index
+
+    # Change tracking ----------------------------------------------------------------------------------------------
+
+    def enable_change_tracking(self) -> None:
+        """ Starts recording when (perf_counter()) each cell last changed, and in which
+        direction (+1 up, -1 down, 0 for non numeric changes), in change_times and
+        change_directions (row positions x columns, see _row_positions()).
+        """
+        if self.change_times is None:
+            shape = (self._capacity, len(self.column_values))
+            self.change_times = np.full(shape, -np.inf)
+            self.change_directions = np.zeros(shape, dtype=np.int8)
+
+    def _record_changes(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> None:
+        positions = self._row_positions(row_indexes)
+        self.last_change_time = time.perf_counter()
+        self.change_times[positions, col_indexes] = self.last_change_time
+        for col, selection in _by_column(col_indexes):
+            rows = positions[selection]
+            try:
+                old = self.column_values[col][rows].astype(float)
+                directions = np.nan_to_num(np.sign(np.asarray(values[selection], dtype=float) - old)).astype(np.int8)
+            except (TypeError, ValueError):
+                directions = 0
+            self.change_directions[rows, col] = directions
+
+    def cell_changes(self, row_indexes: np.ndarray, col_indexes: np.ndarray):
+        """ Returns (change times, change directions) of the given cells. """
+        positions = self._row_positions(row_indexes)
+        return self.change_times[positions, col_indexes], self.change_directions[positions, col_indexes]
+
     @property
     def is_ticking(self):
         return self.tick_interval_ms > 0
 
     def deactivate(self):
         self._is_active = False
+        self.scheduler.unregister(self)
 
     def is_active(self):
         return self._is_active
 
     def __getitem__(self, item):
-        return self.values[item]
+        if isinstance(item, slice):
+            return [DataFrameProxyRow(self.column_values, row) for row in range(*item.indices(len(self)))]
+        if not -len(self) <= item < len(self):
+            raise IndexError(f'Row {item} out of range (0 <= row < {len(self)})')
+        return DataFrameProxyRow(self.column_values, item % len(self))
+
+    def convert_item(self, item: DataFrameProxyRow) -> DataFrameRow:
+        """ Wraps a row of this proxy so its values can be looked up by column name. """
+        return DataFrameRow(self._column_positions, item)
+
+    def get_column_values(self, column_index: int, start: int, stop: int) -> np.ndarray:
+        """ Returns the values of one column of the frame for the rows in [start, stop). """
+        return self.column_values[column_index][start:stop]
 
     def __len__(self):
-        return len(self.values)
+        return self._capacity
+
+
+class StreamingDataFrameProxy(DataFrameProxy):
+    """ A DataFrameProxy rows can be appended to, keeping at most max_rows rows.
+
+    The rows live in ring buffers (one per column) preallocated for max_rows rows, so
+    appending never reallocates nor moves the rows already there: pop_oldest() makes room
+    for append(). The dtypes of the buffers are fixed once: the ones declared in dtypes
+    (column name -> dtype, e.g. float for an integer column that may get NaN), else the
+    ones of the columns of the initial frame - values that do not fit are rejected.
+    Cell updates pushed with apply_updates() follow their row even if older rows are
+    dropped before they are delivered (and are discarded if their own row is dropped).
+    """
+
+    def __init__(self,
+                 df: pd.DataFrame,
+                 *,
+                 max_rows: int,
+                 dtypes: Mapping[Any, Any] | None = None,
+                 refresh_cells_callback: Callable[[list, list], None] | None = None,
+                 scheduler: TickScheduler | None = None,
+                 instrumentation_enabled: bool = False):
+        if max_rows <= 0:
+            raise ValueError(f'StreamingDataFrameProxy max_rows must be positive, got: {max_rows}')
+        initial = df.iloc[len(df) - min(len(df), max_rows):]
+        super().__init__(initial,
+                         refresh_cells_callback=refresh_cells_callback,
+                         scheduler=scheduler,
+                         instrumentation_enabled=instrumentation_enabled)
+        self.max_rows = self._capacity = max_rows
+        self._labels = np.empty(max_rows, dtype=object)
+        self._head = 0  # position in the buffers of the first (oldest) row
+        self._size = 0
+        self._first_seq = 0  # number of rows dropped so far, i.e. sequence number of the first row
+        dtypes = dtypes or {}
+        initial_columns = list(self.column_values)
+        self.column_values[:] = [np.empty(max_rows, dtype=_buffer_dtype(dtypes.get(name, column.dtype)))
+                                 for name, column in zip(df.columns.values, initial_columns)]
+        for col, values in enumerate(initial_columns):
+            self._check_fits(col, values)
+        self._append_columns(initial_columns, initial.index)
+        self._owns_values = True  # the buffers are never the frame's memory
+
+    def _positions(self, rows) -> np.ndarray:
+        return (self._head + np.asarray(rows, dtype=np.intp)) % self.max_rows
+
+    _row_positions = _positions
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            if not -self._size <= item < self._size:
+                raise IndexError(f'Row {item} out of range (0 <= row < {self._size})')
+            return DataFrameProxyRow(self.column_values, (self._head + item % self._size) % self.max_rows)
+        return [DataFrameProxyRow(self.column_values, position)
+                for position in self._positions(np.arange(self._size)[item]).tolist()]
+
+    def get_column_values(self, column_index: int, start: int, stop: int) -> np.ndarray:
+        rows = np.arange(start, min(stop, self._size))
+        return self.column_values[column_index][self._positions(rows)]
+
+    @property
+    def index(self) -> pd.Index:
+        return pd.Index(self._labels[self._positions(np.arange(self._size))])
+
+    def append(self, df: pd.DataFrame) -> None:
+        """ Appends the rows of the frame (with the same columns) - there must be room for them. """
+        if not df.columns.equals(self.df.columns):
+            raise ValueError(f'Cannot append a DataFrame with different columns: {list(df.columns)}')
+        if self._size + len(df) > self.max_rows:
+            raise ValueError(f'No room to append {len(df)} rows ({self._size} of {self.max_rows} rows used) '
+                             f'- call pop_oldest() first')
+        columns = [_column_array(df.iloc[:, i]) for i in range(df.shape[1])]
+        for col, values in enumerate(columns):
+            self._check_fits(col, values)
+        self._append_columns(columns, df.index)
+
+    def _append_columns(self, columns: List[np.ndarray], labels: pd.Index) -> None:
+        positions = self._positions(np.arange(self._size, self._size + len(labels)))
+        for col, values in enumerate(columns):
+            self._write_column(col, positions, values)
+        self._labels[positions] = labels.to_numpy(dtype=object)
+        if self.change_times is not None:
+            self.change_times[positions] = -np.inf
+        self._size += len(labels)
+
+    def pop_oldest(self, n: int) -> None:
+        """ Drops the n oldest rows. """
+        n = min(n, self._size)
+        self._labels[self._positions(np.arange(n))] = None
+        self._head = (self._head + n) % self.max_rows
+        self._size -= n
+        self._first_seq += n
+
+    def _check_fits(self, col: int, values: np.ndarray) -> None:
+        column = self.column_values[col]
+        if _fit_column(column, values)[0] is not column:
+            raise ValueError(f'Values of column {self.df.columns[col]!r} do not fit in its {column.dtype} buffer '
+                             f'- declare its dtype with StreamingDataFrameProxy(dtypes=...)')
+
+    def _write_column(self, col: int, positions: np.ndarray, values: np.ndarray) -> None:
+        self.column_values[col][positions] = _fit_column(self.column_values[col], values)[1]  # checked already
+
+    def post_updates(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> None:
+        for col, selection in _by_column(col_indexes):
+            self._check_fits(col, values[selection])
+        # queued by sequence number, so they still find their row after older rows are dropped
+        super().post_updates(row_indexes + self._first_seq, col_indexes, values)
+
+    def _apply_delivered(self, row_indexes: np.ndarray, col_indexes: np.ndarray, values: np.ndarray) -> None:
+        row_indexes = row_indexes - self._first_seq
+        alive = row_indexes >= 0
+        if not alive.all():
+            row_indexes, col_indexes, values = row_indexes[alive], col_indexes[alive], values[alive]
+        if len(row_indexes):
+            self.update_cells(row_indexes, col_indexes, values)
+        else:
+            self._recorder.dropped_ticks += 1  # all their rows are gone
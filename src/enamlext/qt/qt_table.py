@@ -55,6 +55,11 @@ class QtTable(QtControl, ProxyTable):
             self.set_checkable(d.checkable)
             self.set_sortable(d.sortable)
             self.set_selection_mode(d.selection_mode)
+            self.set_display_cache_size(d.display_cache_size)
+            self.set_prefetch_margin(d.prefetch_margin)
+            self.set_max_rows(d.max_rows)
+            self.set_flash_duration_ms(d.flash_duration_ms)
+            self.set_nan_position(d.nan_position)
 
         # double click action
         self.widget.on_double_click.connect(self._on_double_clicked)
@@ -82,10 +87,15 @@ class QtTable(QtControl, ProxyTable):
 
     # ProxyTable API
     def set_items(self, items: List[Any]):
-        """ Set the items (rows) of the QTable.
+        """ Set the items (rows) of the QTable. With the same columns, the model updates the
+        view in place when the items mostly overlap (keeping the selection and scroll position).
         """
-        with self.widget.updating_internals():
-            self.widget.items = items
+        widget = self.widget
+        if len(widget.items) and widget.columns == self.declaration.columns:
+            widget.items = items
+        else:
+            with widget.updating_internals():  # (first) sizing of the columns
+                widget.items = items
 
     def set_columns(self, columns: List[Column]):
         """ Set the columns of the QTable.
@@ -108,6 +118,21 @@ class QtTable(QtControl, ProxyTable):
     def set_selection_mode(self, selection_mode: str) -> None:
         self.widget.set_selection_mode(SELECTION_MODES_MAP[selection_mode])
 
+    def set_display_cache_size(self, display_cache_size: int) -> None:
+        self.widget.display_cache_size = display_cache_size
+
+    def set_prefetch_margin(self, prefetch_margin: int) -> None:
+        self.widget.prefetch_margin = prefetch_margin
+
+    def set_max_rows(self, max_rows: int) -> None:
+        self.widget.max_rows = max_rows
+
+    def set_flash_duration_ms(self, flash_duration_ms: int) -> None:
+        self.widget.flash_duration_ms = flash_duration_ms
+
+    def set_nan_position(self, nan_position: str) -> None:
+        self.widget.nan_position = nan_position
+
     def set_hints(self, hints: dict) -> None:
         ...  # do nothing because underlying widget does not know about hints
 
@@ -1,24 +1,40 @@
+import bisect
 import contextlib
 import csv
+import datetime
+import heapq
 import itertools
 import logging
 import math
+import numbers
 import operator
+import time
 import warnings
 import weakref
 from abc import abstractmethod, ABC
 from dataclasses import dataclass
+from decimal import Decimal
 from enum import Enum, auto
-from functools import lru_cache
+from functools import lru_cache, partial
 from io import StringIO
-from typing import Optional, Any, List, Tuple, NamedTuple, Collection, Set, Iterable
+from typing import (Optional, Any, List, Tuple, NamedTuple, Collection, Set, Iterable, Dict, Callable, Union, TextIO,
+                    Sequence)
+
+import numpy as np
+import pandas as pd
 
 # Constants
 
-from enamlext.qt.table.column import Column, Alignment, AUTO_ALIGN
+from enamlext.qt.qt_dataframe import DataFrameProxy, StreamingDataFrameProxy, format_values
+from enamlext.qt.table.cache import CellCache, BlockCache
+from enamlext.qt.table.column import Column, Alignment, AUTO_ALIGN, MIXED_ALIGN
 from enamlext.qt.table.defs import CellStyle
 from enamlext.qt.table.filtering import TableFilters, Filter
-from qtpy.QtCore import QAbstractTableModel, QModelIndex, Qt, QObject, QPoint, Signal, QItemSelection, QEvent
+from enamlext.qt.table.images import ImageLoader
+from enamlext.qt.table.profiling import StatsSnapshot, snapshot_columns, export_stats
+from enamlext.qt.table.ranges import coalesce_cells
+from qtpy.QtCore import (QAbstractTableModel, QModelIndex, Qt, QObject, QPoint, Signal, QItemSelection, QEvent,
+                         QRunnable, QThreadPool, QTimer)
 from qtpy.QtGui import QContextMenuEvent, QFont, QColor, QPixmap, QKeySequence
 from qtpy.QtWidgets import QApplication, QTableView, QMenu, QAction
 
@@ -31,6 +47,50 @@ DEFAULT_ROW_HEIGHT = 23
 DEFAULT_FONT_NAME = "Calibri"
 DEFAULT_FONT_SIZE_PX = 13
 
+# Resolved cell styles are shared by the font/foreground/background roles of a cell - this
+# only needs to be big enough to hold a few screens worth of cells (see QTableModel.style_cache_size)
+STYLE_CACHE_SIZE = 10_000
+
+# Columns of DataFrame backed tables are formatted in blocks of rows (with vectorized calls)
+FORMAT_BLOCK_SIZE = 256
+FORMAT_BLOCKS_CACHE_SIZE = 1_024
+
+# refresh_cells(): maximum number of dataChanged signals per call and fraction of
+# the visible cells above which the whole (bounding) range is refreshed at once
+DEFAULT_MAX_REFRESH_RANGES = 64
+DEFAULT_REFRESH_VIEWPORT_THRESHOLD = 0.5
+
+# Above this fraction of changed rows a sorted view is sorted again from scratch instead of
+# moving each changed row to its new position
+INCREMENTAL_SORT_MAX_FRACTION = 0.1
+
+# Assigning new items updates the view in place (keeping the previous order of the rows still there, the
+# selection and the scroll position) instead of resetting it when at least this fraction of them were already there
+MIN_ITEMS_OVERLAP = 0.5
+
+# Where NaN values go when sorting: below any other value, or first/last whatever the sort order
+NAN_POSITIONS = ('smallest', 'first', 'last')
+
+# Appended (with the priority) to the titles of the columns of a multi-column sort - ascending, descending
+SORT_ORDER_ARROWS = ('\u25b2', '\u25bc')
+
+# Sorts of views of at least this many rows by columns without native (NumPy) values are computed in
+# a worker thread, the current order staying visible meanwhile (see QTableModel.background_sort_min_rows)
+BACKGROUND_SORT_MIN_ROWS = 50_000
+
+# Appended to the titles of the columns being sorted by while a background sort is running
+SORT_BUSY_INDICATOR = '\u231b'
+
+# A background sort checks whether it was cancelled every this many rows while extracting the sort keys
+SORT_JOB_CHUNK_SIZE = 10_000
+
+# Cells of DataFrame backed tables that changed in the last flash_duration_ms get a background fading
+# from the color of the direction of the change (up/down/non numeric) to transparent, in FLASH_STEPS steps
+FLASH_COLORS = {1: QColor(0, 170, 0), -1: QColor(210, 0, 0), 0: QColor(255, 190, 0)}
+FLASH_STEPS = 16
+FLASH_MAX_ALPHA = 200
+FLASH_FRAME_MS = 40
+
 CHECKBOX_FLAG = Qt.ItemNeverHasChildren | Qt.ItemIsEditable | Qt.ItemIsUserCheckable | Qt.ItemIsEnabled
 
 
@@ -92,20 +152,266 @@ def make_custom_font(font_spec: str) -> QFont:
     return font
 
 
+def _timed_handler(handler: Callable[[QModelIndex], Any], column: Column, role: int) -> Callable[[QModelIndex], Any]:
+    timer = column.callback_timer
+
+    def timed(index: QModelIndex) -> Any:
+        timer.pop()  # discard user code that ran outside of data() (e.g. sorting, filtering)
+        t0 = time.perf_counter()
+        result = handler(index)
+        elapsed = time.perf_counter() - t0
+        column.record_stats(role=role, elapsed=elapsed, callback_elapsed=timer.pop())
+        return result
+    return timed
+
+
 class Cell(NamedTuple):
     row: int
     column: int
 
 
+def _nan_sort_key(nan_position: str, descending: bool) -> float:
+    """ The key NaN sorts as, so it ends up where nan_position (see NAN_POSITIONS) says. """
+    first = nan_position == 'first' or (nan_position == 'smallest' and not descending)
+    return -math.inf if first != descending else math.inf
+
+
+# sort keys of missing values (None, NaN, NaT), below or above the keys of any other value
+_MISSING_LOW = (-1,)
+_MISSING_HIGH = (3,)
+
+
+def _robust_sort_key(value: Any) -> Optional[tuple]:
+    """ Sort key ordering values of mixed types without raising TypeError: numbers, then strings,
+    then other values grouped by type - None for missing values (None, NaN, NaT).
+    """
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (numbers.Real, Decimal)):
+        return (0, value) if value == value else None
+    if isinstance(value, str):
+        return (1, value)
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        # naive and timezone-aware values can't be compared: the naive ones go first
+        return (2, type(value).__name__, value.utcoffset() is not None, value)
+    if isinstance(value, (datetime.date, datetime.timedelta, bytes)):
+        return (2, type(value).__name__, value)
+    return (2, type(value).__name__, _FallbackKey(value))
+
+
+# types whose values are only partially ordered by < (subsets): ordered by their repr() instead
+_PARTIALLY_ORDERED = (set, frozenset)
+
+
+class _FallbackKey:
+    """ Sort key of the values of any other type: their own order, else the order of their repr()
+    (e.g. dicts, sets) - a total order, never raising TypeError.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self._compare(other) == 0
+
+    def __lt__(self, other):
+        return self._compare(other) < 0
+
+    def _compare(self, other: '_FallbackKey') -> int:
+        value, other_value = self.value, other.value
+        if not isinstance(value, _PARTIALLY_ORDERED):
+            try:
+                if value < other_value:
+                    return -1
+                if other_value < value:
+                    return 1
+                if value == other_value:
+                    return 0
+            except Exception:  # unorderable (TypeError), or ambiguous truth values (arrays)
+                pass
+        value_repr, other_repr = repr(value), repr(other_value)
+        return (value_repr > other_repr) - (value_repr < other_repr)
+
+
+class _Descending:
+    """ Sort key wrapper reversing the order of the wrapped key. """
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+class _ViewItems(Sequence):
+    """ The items of a filtered and/or sorted view, read through the source row of each view row
+    (QTableModel._view_to_source) - the items themselves are never copied.
+    """
+
+    __slots__ = ('_model',)
+
+    def __init__(self, model: 'QTableModel'):
+        self._model = model
+
+    def __getitem__(self, index):
+        model = self._model
+        if isinstance(index, slice):
+            source = model._original_items
+            return [source[row] for row in model._view_to_source[index].tolist()]
+        return model._original_items[model._view_to_source.item(index)]
+
+    def __iter__(self):
+        source = self._model._original_items
+        return (source[row] for row in self._model._view_to_source.tolist())
+
+    def __len__(self):
+        return len(self._model._view_to_source)
+
+
+def _make_flash_ramp(colors: Dict[int, QColor]) -> Dict[int, List[QColor]]:
+    """ Precomputes the backgrounds of the flash of a cell, for each direction and fading step. """
+    ramp = {}
+    for direction, color in colors.items():
+        ramp[direction] = [QColor(color.red(), color.green(), color.blue(),
+                                  round(FLASH_MAX_ALPHA * (1 - step / FLASH_STEPS)))
+                           for step in range(FLASH_STEPS)]
+    return ramp
+
+
+def _drop_oldest(items: Union[List[Any], StreamingDataFrameProxy], n: int) -> None:
+    if isinstance(items, StreamingDataFrameProxy):
+        items.pop_oldest(n)
+    else:
+        del items[:n]
+
+
+def _append(items: Union[List[Any], StreamingDataFrameProxy], new_items: Union[List[Any], pd.DataFrame]) -> None:
+    if isinstance(items, StreamingDataFrameProxy):
+        items.append(new_items)
+    else:
+        items.extend(new_items)
+
+
 def default_convert_item(item):
     return item
 
 
+_MISSING = object()  # sentinel for cache misses
+
+# Roles whose values are cached by the model (a dataChanged for other roles leaves the caches untouched)
+_CACHED_ROLES = {Qt.DisplayRole, Qt.FontRole, Qt.ForegroundRole, Qt.BackgroundColorRole}
+
+
+class _PrefetchJob(QRunnable):
+    """ Computes display strings and cell styles for a window of cells in a worker
+    thread. Results are delivered back to the model in the GUI thread, which only
+    keeps them if nothing changed in the meantime (see QTableModel.prefetch).
+
+    The items and the contexts of the cells are picked in the GUI thread: only the
+    column getters, fmt and cell_style callbacks run in the worker thread.
+    """
+
+    def __init__(self, model: 'QTableModel', generation: int,
+                 cells: List[Tuple[int, int, Column, Any, bool, Optional[TableContext]]]):
+        super().__init__()
+        self.model = model
+        self.generation = generation
+        self.cells = cells  # (row, col_index, column, item, needs display, context if it needs the style)
+        self.cancelled = False
+
+    def run(self):
+        displayed, styles = {}, {}
+        for row, col_index, column, item, needs_display, context in self.cells:
+            if self.cancelled:
+                return
+            key = (row, col_index)
+            try:
+                if needs_display:
+                    displayed[key] = column.get_displayed_value(item)
+                if context is not None:
+                    styles[key] = column.get_cell_style(context)
+            except Exception:
+                continue  # leave it to data() (in the GUI thread) to report the error
+        try:
+            self.model._prefetched.emit(self.generation, displayed, styles)
+        except RuntimeError:
+            pass  # the model was destroyed in the meantime
+
+
+class _SortJob(QRunnable):
+    """ Extracts the sort keys and orders the rows of a view in a worker thread. The order is
+    applied by the model in the GUI thread, unless a newer sort superseded the job or rows were
+    inserted or removed in the meantime - rows changed meanwhile are sorted again once the order
+    is applied (see QTableModel._on_sorted).
+
+    Note: the column getters run in the worker thread.
+    """
+
+    def __init__(self, model: 'QTableModel', rows_generation: int, sorting_columns: List[Tuple[Column, int, Any]],
+                 source_rows: np.ndarray, sort_key_cache: Dict[int, List[Optional[tuple]]]):
+        super().__init__()
+        self.model = model
+        self.rows_generation = rows_generation
+        self.sorting_columns = sorting_columns
+        self.source_rows = source_rows
+        self.sort_key_cache = sort_key_cache  # reused keys, plus the ones extracted by the job
+        self.order = None  # positions of source_rows in sorted order (None if the job failed)
+        self.sort_keys = None
+        self.changed_rows = set()  # source rows changed while the job runs (noted by the model)
+        self.cancelled = False
+
+    def run(self):
+        model = self.model
+        items = model._original_items
+        try:
+            for column, column_index, _ in self.sorting_columns:
+                if column_index in self.sort_key_cache or model._native_column(column) is not None:
+                    continue
+                keys = []
+                for start in range(0, len(items), SORT_JOB_CHUNK_SIZE):
+                    if self.cancelled:
+                        return
+                    keys.extend(_robust_sort_key(column.get_value(item))
+                                for item in items[start:start + SORT_JOB_CHUNK_SIZE])
+                self.sort_key_cache[column_index] = keys
+            if self.cancelled:
+                return
+            keys = model._python_sort_keys(self.source_rows, self.sorting_columns, self.sort_key_cache)
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            if self.cancelled:
+                return
+            self.sort_keys = [keys[i] for i in order]
+            self.order = np.asarray(order, dtype=np.intp)
+        except Exception:
+            pass  # leave it to the GUI thread to sort again (and report the error)
+        try:
+            model._sorted.emit(self)
+        except RuntimeError:
+            pass  # the model was destroyed in the meantime
+
+
 class QTableModel(QAbstractTableModel):
 
     #: signal used to notify the view whenever checked_items changes
     on_checked_items: Signal = Signal(set)
 
+    #: emitted (in the GUI thread) when the results of prefetch() have been stored
+    prefetchFinished: Signal = Signal()
+
+    # internal: delivers the results of a prefetch job (queued connection)
+    _prefetched: Signal = Signal(int, object, object)
+
+    #: emitted (in the GUI thread) when a background sort starts (True) and when it is over (False)
+    backgroundSortChanged: Signal = Signal(bool)
+
+    # internal: delivers a finished background sort job (queued connection)
+    _sorted: Signal = Signal(object)
+
     def __init__(self,
                  columns: List[Column],
                  items: Optional[List[Any]] = None,
@@ -115,18 +421,67 @@ class QTableModel(QAbstractTableModel):
                  parent: Optional[QObject] = None,
                  error_handling: str = 'graceful',  # TODO: other modes
                  convert_item = default_convert_item,
+                 display_cache_size: int = 0,
+                 style_cache_size: int = STYLE_CACHE_SIZE,
+                 max_rows: int = 0,
+                 flash_duration_ms: int = 0,
+                 nan_position: str = 'smallest',
                  ):
         super().__init__(parent)
-        self.columns = columns
+        self._columns = columns
         self._original_items = items
-        self.checkable = checkable
+        self.max_rows = max_rows  # for append_items() (0 for no limit)
+
+        # Flashing of changed cells (DataFrameProxy sources) - see flash_duration_ms
+        self._flash_duration = flash_duration_ms / 1_000
+        self._flash_ramp = _make_flash_ramp(FLASH_COLORS)
+        self._enable_change_tracking()
+        self._checkable = checkable
         self.error_handling = error_handling
         if convert_item is None:
             convert_item = default_convert_item
         self.convert_item = convert_item
 
-        # Filtering
-        self._filtered_items = None
+        # Caching of formatted values (opt-in) and cell styles - kept in sync with the change notifications
+        self._display_cache = None
+        self.display_cache_size = display_cache_size
+        self._style_cache = None
+        self.style_cache_size = style_cache_size
+        self._format_blocks = BlockCache(FORMAT_BLOCKS_CACHE_SIZE, block_size=FORMAT_BLOCK_SIZE)
+        self._column_alignments = {}  # Column -> Qt alignment
+
+        # Images are decoded off the GUI thread - we keep track of the cells waiting for them
+        self._image_loader = ImageLoader(parent=self)
+        self._image_loader.imageReady.connect(self._on_image_ready)
+        self._image_requests = {}  # path -> {(row, column), ...}
+        self.modelReset.connect(self._invalidate_caches)
+        self.layoutChanged.connect(self._invalidate_caches)
+        self.rowsRemoved.connect(self._invalidate_caches)
+        self.rowsInserted.connect(self._on_rows_inserted)
+        self.dataChanged.connect(self._on_data_changed)
+        self._rows_generation = 0  # bumped when rows are inserted or removed (see _on_sorted)
+        for signal in (self.modelReset, self.rowsInserted, self.rowsRemoved):
+            signal.connect(self._on_rows_changed)
+
+        # Prefetching (computed in a worker thread, stored only if no change notification happened meanwhile)
+        self._data_generation = 0
+        self._prefetch_job = None
+        self._prefetched.connect(self._on_prefetched)
+
+        # Filtering and sorting - the view rows are tracked as indexes into the original items
+        # (view row -> source row and back, None while the view shows the items as they are)
+        self._view_items = _ViewItems(self)
+        self._view_to_source = None
+        self._source_to_view = None
+        self._sort_keys = None  # sort keys of the view rows, in view order
+        self._sorting_columns = []  # [(column, column_index, order)] by priority
+        self._sort_key_cache = {}  # column_index -> robust sort keys of the source rows (see _column_sort_keys())
+        self.nan_position = nan_position
+
+        # Sorting large views by Python values happens in a worker thread (0 to always sort in the GUI thread)
+        self.background_sort_min_rows = BACKGROUND_SORT_MIN_ROWS
+        self._sort_job = None
+        self._sorted.connect(self._on_sorted)
         self.filters = TableFilters()
         self._apply_filters()
 
@@ -142,7 +497,8 @@ class QTableModel(QAbstractTableModel):
         self._font = self._create_font()  # cache the font
         self._font_bold = self._create_font(bold=True)
 
-        self._last_sorting_column = None
+        self._role_handlers = []
+        self._compile_role_handlers()
 
     def __len__(self):
         return len(self.items)  # O(1)
@@ -163,159 +519,236 @@ class QTableModel(QAbstractTableModel):
             return super().flags(index)
 
     def data(self, index: QModelIndex, role: int) -> Any:
-        column = self.get_column_by_index(index.column())
+        if not index.isValid():
+            return None
+        # roles not used by the column are not in its table - Qt gets None for those
+        if (handler := self._role_handlers[index.column()].get(role)) is not None:
+            return handler(index)
+
+    # Role dispatch ---------------------------------------------------------------------------------------------------
+
+    def _compile_role_handlers(self) -> None:
+        """ Builds, for each column of the view, the table of handlers answering data()
+        for each role. This runs whenever the columns or the checkable flag change, so
+        data() itself does not need to figure out what a column supports.
+        """
+        role_handlers = []
+        if self._checkable:
+            # Only the first column is checkable (index = 0) - data columns are offset by one
+            font = self._font
+            role_handlers.append({
+                Qt.CheckStateRole: self._check_state_data,
+                Qt.FontRole: lambda index: font,
+            })
+
+        offset = len(role_handlers)
+        for i, column in enumerate(self._columns):
+            role_handlers.append(self._compile_timed_column_handlers(i + offset, column))
+            column.observe_collect_stats(self)
+
+        self._role_handlers = role_handlers
+
+    def _compile_timed_column_handlers(self, col_index: int, column: Column) -> Dict[int, Callable[[QModelIndex], Any]]:
+        handlers = self._compile_column_handlers(col_index, column)
         if column.collect_stats:
-            t0 = time.perf_counter()
-            result = self._data(index, role)
-            t1 = time.perf_counter()
-            column.record_stats(role=role, elapsed=t1 - t0)
-            return result
+            handlers = {role: _timed_handler(handler, column, role) for role, handler in handlers.items()}
+        return handlers
+
+    def collect_stats_changed(self, column: Column) -> None:
+        """ Compiles again the handlers of the column, timed only while it collects stats. """
+        offset = int(self._checkable)
+        for i, displayed in enumerate(self._columns):
+            if displayed is column:
+                self._role_handlers[i + offset] = self._compile_timed_column_handlers(i + offset, column)
+
+    def _compile_column_handlers(self, col_index: int, column: Column) -> Dict[int, Callable[[QModelIndex], Any]]:
+        handlers = {}
+
+        if getattr(column, 'df_index', None) is not None and not callable(column.fmt):
+            handlers[Qt.DisplayRole] = partial(self._columnar_display_data, col_index, column)
         else:
-            return self._data(index, role)
+            handlers[Qt.DisplayRole] = partial(self._display_data, col_index, column)
 
-    def _data(self, index, role):
-        if role == Qt.DisplayRole:
-            if self.checkable:
-                offset = 1
+        if column.align is MIXED_ALIGN:
+            handlers[Qt.TextAlignmentRole] = partial(self._cell_alignment_data, col_index, column)
+        elif column.align is AUTO_ALIGN:
+            handlers[Qt.TextAlignmentRole] = partial(self._column_alignment_data, col_index, column)
+        else:
+            alignment = to_qt_alignment(column.align)
+            handlers[Qt.TextAlignmentRole] = lambda index: alignment
+
+        if column.tooltip is None and type(column).get_tooltip is Column.get_tooltip:
+            handlers[Qt.ToolTipRole] = partial(self._default_tooltip_data, column)
+        elif isinstance(column.tooltip, str) and type(column).get_tooltip is Column.get_tooltip:
+            tooltip = column.tooltip
+            handlers[Qt.ToolTipRole] = lambda index: tooltip
+        else:
+            handlers[Qt.ToolTipRole] = partial(self._tooltip_data, col_index, column)
+
+        if column.cell_style is not None:
+            handlers[Qt.FontRole] = partial(self._font_data, col_index, column)
+            handlers[Qt.ForegroundRole] = partial(self._style_data, 'color', col_index, column)
+            handlers[Qt.BackgroundColorRole] = partial(self._style_data, 'background', col_index, column)
+        else:
+            font = self._font
+            handlers[Qt.FontRole] = lambda index: font
+
+        if self._flash_duration and getattr(column, 'df_index', None) is not None:
+            handlers[Qt.BackgroundColorRole] = partial(self._flash_background_data, column.df_index,
+                                                       handlers.get(Qt.BackgroundColorRole))
+
+        if column.image is not None:
+            handlers[Qt.DecorationRole] = partial(self._decoration_data, col_index, column)
+
+        return handlers
+
+    def _make_context(self, index: QModelIndex, role: int, col_index: int, column: Column, **kwargs) -> TableContext:
+        return TableContext(
+            model=self,
+            index=index,
+            role=role,
+            column_index=col_index,
+            column=column,
+            convert=self.convert_item,
+            **kwargs,
+        )
+
+    def _display_data(self, col_index: int, column: Column, index: QModelIndex) -> str:
+        if (cache := self._display_cache) is not None:
+            key = (index.row(), col_index)
+            if (value := cache.get(key, _MISSING)) is _MISSING:
+                value = column.get_displayed_value(self.items[key[0]])
+                cache.put(key, value)
+            return value
+        item = self.items[index.row()]  # O(1)
+        return column.get_displayed_value(item)
+
+    def _columnar_display_data(self, col_index: int, column: Column, index: QModelIndex) -> str:
+        if self._is_columnar_source:
+            return self._get_block_displayed_value(index.row(), col_index, column.df_index, column.fmt)
+        return self._display_data(col_index, column, index)
+
+    def _column_alignment_data(self, col_index: int, column: Column, index: QModelIndex) -> Optional[QtAlignment]:
+        try:
+            return self._get_column_alignment(column)
+        except Exception as exc:
+            if self.error_handling == 'graceful':
+                logger.warning(f'Error when resolving alignment for column: {col_index = }, '
+                               f'{column.title = !r}, {index.row() = }, {exc = }')
             else:
-                offset = 0
-            if (col_index := index.column()) or not self.checkable:
-                column = self.columns[col_index - offset]  # O(1)
-                item = self.items[index.row()]  # O(1)
-                return column.get_displayed_value(item)
-        elif role == Qt.TextAlignmentRole:
-            if self.checkable:
-                offset = 1
+                raise
+
+    def _cell_alignment_data(self, col_index: int, column: Column, index: QModelIndex) -> Optional[QtAlignment]:
+        try:
+            item = self.convert_item(self.items[index.row()])  # O(1)
+            return to_qt_alignment(column.get_align(item))
+        except Exception as exc:
+            if self.error_handling == 'graceful':
+                logger.warning(f'Error when resolving alignment for column: {col_index = }, '
+                               f'{column.title = !r}, {index.row() = }, {exc = }')
             else:
-                offset = 0
-            # Only the first column is checkable (index = 0) - so we need to account for that offset
-            if (col_index := index.column()) or not self.checkable:
-                column = self.columns[col_index - offset]  # O(1)
-                item = self.convert_item(self.items[index.row()])  # O(1)
-                try:
-                    return to_qt_alignment(column.get_align(item))
-                except Exception as exc:
-                    if self.error_handling == 'graceful':
-                        logger.warning(f'Error when resolving alignment for column: {col_index = }, '
-                                       f'{column.title = !r}, {index.row() = }, {exc = }')
-                    else:
-                        raise
-        elif role == Qt.ToolTipRole:
-            col_index = index.column()
-            column = self.get_column_by_index(col_index)
-            context = TableContext(
-                model=self,
-                index=index,
-                role=role,
-                column_index=col_index,
-                column=column,
-                convert=self.convert_item,
-            )  # TODO: should we check if the column has a tooltip callback before creating this?
-            return column.get_tooltip(context)
-        elif role == Qt.CheckStateRole and self.checkable and index.column() == 0:
-            # TODO: think about using the check state of the vertical header to control checked items
-            #       what if we want to have more than 1 column that is checkable?
-            #       should we keep a collection of checked items separately or should we consider wrapping each
-            #       item in a wrapper object that holds the checked state? how about a proxy object?
-            item = self.items[index.row()]  # O(1)
-            if item in self.checked_items:
-                return Qt.Checked
+                raise
+
+    def _default_tooltip_data(self, column: Column, index: QModelIndex) -> str:
+        return repr(column.get_value(self.items[index.row()]))
+
+    def _tooltip_data(self, col_index: int, column: Column, index: QModelIndex) -> str:
+        return column.get_tooltip(self._make_context(index, Qt.ToolTipRole, col_index, column))
+
+    def _check_state_data(self, index: QModelIndex) -> int:
+        # TODO: think about using the check state of the vertical header to control checked items
+        #       what if we want to have more than 1 column that is checkable?
+        #       should we keep a collection of checked items separately or should we consider wrapping each
+        #       item in a wrapper object that holds the checked state? how about a proxy object?
+        item = self.items[index.row()]  # O(1)
+        if item in self.checked_items:
+            return Qt.Checked
+        else:
+            return Qt.Unchecked
+
+    def _font_data(self, col_index: int, column: Column, index: QModelIndex) -> QFont:
+        style = self._get_cell_style(index, Qt.FontRole, col_index, column)
+        if style is not None and (font_spec := style.get('font')) is not None:
+            return make_custom_font(font_spec)
+        return self._font
+
+    def _style_data(self, attribute: str, col_index: int, column: Column, index: QModelIndex) -> Optional[QColor]:
+        role = Qt.ForegroundRole if attribute == 'color' else Qt.BackgroundColorRole
+        style = self._get_cell_style(index, role, col_index, column)
+        if style is not None:
+            return style.get(attribute)
+
+    def _flash_background_data(self, df_index: int, fallback: Optional[Callable[[QModelIndex], Any]],
+                               index: QModelIndex) -> Optional[QColor]:
+        if (source := self._flashing_source) is not None:
+            row = index.row()
+            if self._view_to_source is not None:
+                row = self._view_to_source[row]
+            change_time, direction = source.cell_changes(row, df_index)
+            if (age := time.perf_counter() - change_time) < self._flash_duration:
+                return self._flash_ramp[int(direction)][int(age / self._flash_duration * FLASH_STEPS)]
+        if fallback is not None:
+            return fallback(index)
+
+    def _decoration_data(self, col_index: int, column: Column, index: QModelIndex) -> Optional[QPixmap]:
+        context = self._make_context(index, Qt.DecorationRole, col_index, column)
+        if (image := column.get_image(context)):
+            pixmap = self._image_loader.get(image)
+            if self._image_loader.is_pending(image):
+                # repaint this cell as soon as the image has been decoded
+                self._image_requests.setdefault(image, set()).add((index.row(), col_index))
+            return pixmap
+
+    def _get_block_displayed_value(self, row: int, col_index: int, df_index: int, fmt: str) -> str:
+        """ Formats the block of rows around the requested one in a single vectorized
+        call, so painting the visible window costs one call per column.
+        """
+        block_size = self._format_blocks.block_size
+        block_no, offset = divmod(row, block_size)
+        key = (block_no, col_index)
+        if (block := self._format_blocks.get(key)) is None:
+            start = block_no * block_size
+            values = self.items.get_column_values(df_index, start, start + block_size)
+            block = format_values(values, fmt)
+            self._format_blocks.put(key, block)
+        return block[offset]
+
+    @property
+    def _is_columnar_source(self) -> bool:
+        # only while the view rows are the frame rows (i.e. not filtered nor sorted)
+        return self._view_to_source is None and isinstance(self._original_items, DataFrameProxy)
+
+    def _get_column_alignment(self, column: Column) -> QtAlignment:
+        """ Alignment shared by all the cells of the column (inferred once for AUTO_ALIGN). """
+        if (align := self._column_alignments.get(column)) is None:
+            items = self._original_items if self._original_items is not None else []
+            align = self._column_alignments[column] = to_qt_alignment(column.infer_align(items, self.convert_item))
+        return align
+
+    def _get_cell_style(self, index: QModelIndex, role: int, col_index: int, column: Column) -> Optional[CellStyle]:
+        """ Resolves the cell style once and shares it among the font, foreground
+        and background roles (which Qt requests one after the other for each cell).
+        The context given to the callback carries the role of the first request.
+        """
+        key = (index.row(), col_index)
+        style_cache = self._style_cache
+        if style_cache is not None and (style := style_cache.get(key, _MISSING)) is not _MISSING:
+            return style
+
+        context = self._make_context(index, role, col_index, column)
+        try:
+            style = column.get_cell_style(context)
+        except Exception as exc:
+            if self.error_handling == 'graceful':
+                logger.warning(f'Error when resolving cell style for column: {col_index = }, '
+                               f'{column.title = !r}, {index.row() = }, {exc = }')
+                style = None
             else:
-                return Qt.Unchecked
-        elif role == Qt.FontRole:
-            col_index = index.column()
-            column = self.get_column_by_index(col_index)
-            if column.cell_style is not None:
-                context = TableContext(
-                    model=self,
-                    index=index,
-                    role=role,
-                    column_index=col_index,
-                    column=column,
-                    convert=self.convert_item,
-                )
-                try:
-                    style = column.get_cell_style(context)
-                    if style is not None and (font_spec := style.get('font')) is not None:
-                        return make_custom_font(font_spec)
-                except Exception as exc:
-                    if self.error_handling == 'graceful':
-                        logger.warning(f'Error when resolving font for column: {col_index = }, '
-                                       f'{column.title = !r}, {index.row() = }, {exc = }')
-                    else:
-                        raise
-
-            return self._font
-
-        elif role == Qt.ForegroundRole:
-            col_index = index.column()
-            column = self.get_column_by_index(col_index)
-            if column.cell_style is not None:
-                context = TableContext(
-                    model=self,
-                    index=index,
-                    role=role,
-                    column_index=col_index,
-                    column=column,
-                    convert=self.convert_item,
-                )
-                try:
-                    style = column.get_cell_style(context)
-                    if style is not None:
-                        return style.get('color')
-                except Exception as exc:
-                    if self.error_handling == 'graceful':
-                        logger.warning(f'Error when resolving foreground colour style for column: {col_index = }, '
-                                       f'{column.title = !r}, {index.row() = }, {exc = }')
-                    else:
-                        raise
-
-        elif role == Qt.BackgroundColorRole:
-            col_index = index.column()
-            column = self.get_column_by_index(col_index)
-            if column.cell_style is not None:
-                context = TableContext(
-                    model=self,
-                    index=index,
-                    role=role,
-                    column_index=col_index,
-                    column=column,
-                    convert=self.convert_item,
-                )
-                try:
-                    style = column.get_cell_style(context)
-                    if style is not None:
-                        return style.get('background')
-                except Exception as exc:
-                    if self.error_handling == 'graceful':
-                        logger.warning(f'Error when resolving background colour style for column: {col_index = }, '
-                                       f'{column.title = !r}, {index.row() = }, {exc = }')
-                    else:
-                        raise
-
-        elif role == Qt.DecorationRole:  # TODO: refactor (DRY)
-            col_index = index.column()
-            column = self.get_column_by_index(col_index)
-            if column.image is not None:
-                context = TableContext(
-                    model=self,
-                    index=index,
-                    role=role,
-                    column_index=col_index,
-                    column=column,
-                    convert=self.convert_item,
-                )
-                if (image := column.get_image(context)):
-                    img = QPixmap()
-                    img.load(image)
-
-                    # TODO: make this resizing thing better
-                    if img.height() > 24:
-                        img = img.scaledToHeight(24)
-                    if img.width() > 24:
-                        img = img.scaledToWidth(24)
-
-                    return img
+                raise
+
+        if style_cache is not None:
+            style_cache.put(key, style)
+        return style
 
     def sort(self, column_index, order=None) -> None:
         if self.columns:
@@ -323,30 +756,318 @@ class QTableModel(QAbstractTableModel):
             #       be keeping a referencing to the column and improve 
             #       Column identity and equality comparison to restore sorting
             column = self.columns[column_index]
-            self._last_sorting_column = column, column_index, order
+            self._set_sorting_columns([(column, column_index, order)])
+
+    def add_sort_column(self, column_index: int, order=None) -> None:
+        """ Sorts by one more column (after the ones already sorted by), or changes the order of a
+        column already sorted by - flipping it unless an order is given (see Shift+click on the header).
+        """
+        if not self.columns:
+            return
+        sorting_columns = list(self._sorting_columns)
+        for i, (column, index, current_order) in enumerate(sorting_columns):
+            if index == column_index:
+                if order is None:
+                    order = Qt.AscendingOrder if current_order else Qt.DescendingOrder
+                sorting_columns[i] = column, column_index, order
+                break
+        else:
+            sorting_columns.append((self.columns[column_index], column_index, order or Qt.AscendingOrder))
+        self._set_sorting_columns(sorting_columns)
+
+    @property
+    def sort_columns(self) -> List[Tuple[int, Qt.SortOrder]]:
+        """ (column index, order) of the columns sorted by, by priority (including a background sort
+        still running).
+        """
+        return [(column_index, Qt.DescendingOrder if order else Qt.AscendingOrder)
+                for _, column_index, order in self._requested_sorting_columns]
+
+    @property
+    def _requested_sorting_columns(self) -> List[Tuple[Column, int, Any]]:
+        return self._sort_job.sorting_columns if self._sort_job is not None else self._sorting_columns
+
+    @property
+    def sorting_in_background(self) -> bool:
+        """ Whether a sort is running in a worker thread (the view still shows the previous order). """
+        return self._sort_job is not None
+
+    def _set_sorting_columns(self, sorting_columns: List[Tuple[Column, int, Any]], background: bool = True) -> None:
+        was_sorting = self._cancel_background_sort()
+        if background and self._sorts_in_background(sorting_columns):
+            self._start_background_sort(sorting_columns)
+        else:
+            self._sorting_columns = sorting_columns
+            indexes = {column_index for _, column_index, _ in sorting_columns}
+            self._sort_key_cache = {i: keys for i, keys in self._sort_key_cache.items() if i in indexes}
             self._apply_sorting()
+        self._sorting_state_changed(was_sorting)
+
+    def _sorting_state_changed(self, was_sorting: bool) -> None:
+        if self.sorting_in_background != was_sorting:
+            self.backgroundSortChanged.emit(self.sorting_in_background)
+        self.headerDataChanged.emit(Qt.Horizontal, 0, max(self.columnCount() - 1, 0))
 
     def _apply_sorting(self):
-        if self._last_sorting_column is not None:
-            previous_column, column_index, order = self._last_sorting_column
+        if self._refresh_sorting_columns():
+            self.beginResetModel()
+            self._sort_view()
+            self.endResetModel()
+
+    def _refresh_sorting_columns(self) -> bool:
+        """ Picks up the columns now at the indexes sorted by - returns False (nothing to sort by)
+        if there are none or they do not seem to be the same columns anymore.
+        """
+        if not self._sorting_columns:
+            return False
+        sorting_columns = []
+        for previous_column, column_index, order in self._sorting_columns:
             try:
                 column = self.columns[column_index]
             except IndexError:
                 # TODO: we should still try to find if the column is there in another index
-                return
+                return False
             else:
                 if column.title != previous_column.title:
                     # not very likely to be the same column - avoid sorting incorrectly
-                    return
-            self.beginResetModel()
-            def sort_key(item):
-                value = column.get_value(item)
-                if isinstance(value, float):
-                    if math.isnan(value):
-                        return float('-inf')
-                return value
-            self._filtered_items = sorted(self._filtered_items, key=sort_key, reverse=order)
-            self.endResetModel()
+                    return False
+            sorting_columns.append((column, column_index, order))
+        self._sorting_columns = sorting_columns
+        return True
+
+    def _sort_indicator(self, column: Column) -> str:
+        """ Suffix for the title of a column sorted by: the arrow of its order and its priority
+        (multi-column sorts) and whether it is being sorted in the background.
+        """
+        sorting_columns = self._requested_sorting_columns
+        for priority, (sorting_column, _, order) in enumerate(sorting_columns, 1):
+            if sorting_column is column:
+                suffix = f' {SORT_ORDER_ARROWS[bool(order)]}{priority}' if len(sorting_columns) > 1 else ''
+                return suffix + f' {SORT_BUSY_INDICATOR}' if self._sort_job is not None else suffix
+        return ''
+
+    @property
+    def nan_position(self) -> str:
+        """ Where NaN values go when sorting (see NAN_POSITIONS). """
+        return self._nan_position
+
+    @nan_position.setter
+    def nan_position(self, nan_position: str) -> None:
+        if nan_position not in NAN_POSITIONS:
+            raise ValueError(f'Invalid nan_position: {nan_position!r} (expected one of {NAN_POSITIONS})')
+        self._nan_position = nan_position
+        self._apply_sorting()
+
+    def _sort_view(self) -> None:
+        source_rows = self._view_source_rows()
+        if (keys := self._native_sort_keys()) is not None:
+            order = np.lexsort(keys[::-1])
+            sort_keys = keys[0][order]
+        else:
+            keys = self._python_sort_keys(source_rows)
+            order = np.asarray(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.intp)
+            sort_keys = [keys[i] for i in order.tolist()]
+        self._set_view_order(source_rows, order, sort_keys)
+
+    def _set_view_order(self, source_rows: np.ndarray, order: np.ndarray, sort_keys: Union[list, np.ndarray]) -> None:
+        """ Reorders the view rows (source_rows, in view order) as given by order (their positions). """
+        self._set_view_rows(source_rows[order])
+        self._sort_keys = sort_keys
+
+    def _view_source_rows(self) -> np.ndarray:
+        if self._view_to_source is None:
+            return np.arange(len(self._original_items), dtype=np.intp)
+        return self._view_to_source
+
+    def _native_column(self, column: Column) -> Optional[np.ndarray]:
+        """ The numeric column array of a DataFrameProxy the column displays, if any. """
+        source = self._original_items
+        if getattr(column, 'df_index', None) is None or not isinstance(source, DataFrameProxy):
+            return None
+        values = source.column_values[column.df_index]
+        return values if values.dtype.kind in 'biuf' else None
+
+    def _native_sort_keys(self) -> Optional[List[np.ndarray]]:
+        """ Sort keys of the view rows - one array per sorting column, directed so they all sort
+        ascending - read straight from the column arrays of a DataFrameProxy, or None unless all
+        the sorting columns are numeric columns of it.
+        """
+        source = self._original_items
+        if not isinstance(source, DataFrameProxy):
+            return None
+        positions = source._row_positions(self._view_source_rows())
+
+        keys = []
+        for column, _, order in self._sorting_columns:
+            if (values := self._native_column(column)) is None:
+                return None
+            descending = bool(order)
+            column_keys = values[positions]
+            kind = column_keys.dtype.kind
+            if kind == 'f':
+                column_keys[np.isnan(column_keys)] = _nan_sort_key(self._nan_position, descending)
+                if descending:
+                    column_keys = -column_keys
+            elif descending:
+                # reversed without overflowing (negating the smallest integer gives itself back)
+                column_keys = np.iinfo(column_keys.dtype).max - column_keys if kind == 'u' else ~column_keys
+            keys.append(column_keys)
+        return keys
+
+    def _python_sort_keys(self, source_rows: np.ndarray, sorting_columns: Optional[List[Tuple[Column, int, Any]]] = None,
+                          sort_key_cache: Optional[Dict[int, List[Optional[tuple]]]] = None) -> List[tuple]:
+        """ Sort keys of the given rows: tuples of one key per sorting column, directed so they
+        all sort ascending (so the keys of a sorted view can be bisected).
+        """
+        if sorting_columns is None:
+            sorting_columns = self._sorting_columns
+        per_column = []
+        for column, column_index, order in sorting_columns:
+            descending = bool(order)
+            missing = _MISSING_LOW if _nan_sort_key(self._nan_position, descending) < 0 else _MISSING_HIGH
+            keys = [missing if key is None else key
+                    for key in self._column_sort_keys(column, column_index, source_rows, sort_key_cache)]
+            per_column.append([_Descending(key) for key in keys] if descending else keys)
+        return list(zip(*per_column))
+
+    def _column_sort_keys(self, column: Column, column_index: int, source_rows: np.ndarray,
+                          sort_key_cache: Optional[Dict[int, List[Optional[tuple]]]] = None) -> List[Optional[tuple]]:
+        """ Robust sort keys of the values of one column for the given rows. The keys of all the rows
+        are extracted once (through the column getter) and kept up to date as rows change, are
+        appended and dropped - so sorting again does not call the getters.
+        """
+        source = self._original_items
+        if (values := self._native_column(column)) is not None:
+            return [_robust_sort_key(value) for value in values[source._row_positions(source_rows)].tolist()]
+        if sort_key_cache is None:
+            sort_key_cache = self._sort_key_cache
+        if (keys := sort_key_cache.get(column_index)) is None:
+            keys = sort_key_cache[column_index] = [_robust_sort_key(column.get_value(item)) for item in source]
+        return [keys[row] for row in source_rows.tolist()]
+
+    def _update_sort_key_cache(self, rows: np.ndarray, cols: np.ndarray, first_new_row: Optional[int] = None) -> None:
+        """ Refreshes the cached sort keys of the given (changed) cells, and adds the keys of the rows
+        from first_new_row on (appended).
+        """
+        source = self._original_items
+        for column_index, keys in self._sort_key_cache.items():
+            column = self.columns[column_index]
+            for row in np.unique(rows[cols == column_index]).tolist():
+                keys[row] = _robust_sort_key(column.get_value(source[row]))
+            if first_new_row is not None:
+                keys.extend(_robust_sort_key(column.get_value(source[row])) for row in range(first_new_row, len(source)))
+
+    def refresh_view_cells(self, rows: np.ndarray, cols: np.ndarray) -> None:
+        """ Refreshes the cached sort keys of the given changed cells (rows and columns of the view),
+        so sorting again picks up their new values.
+        """
+        if self._sort_key_cache and len(rows):
+            if self._view_to_source is not None:
+                rows = self._view_to_source[rows]
+            self._update_sort_key_cache(rows, cols - int(self._checkable))
+
+    def _set_view_rows(self, view_to_source: Optional[np.ndarray]) -> None:
+        self._sort_keys = None
+        self._view_to_source = view_to_source
+        self._update_source_to_view()
+
+    def _update_source_to_view(self) -> None:
+        if self._view_to_source is None:
+            self._source_to_view = None
+        else:
+            n_sources = len(self._original_items) if self._original_items is not None else 0
+            self._source_to_view = np.full(n_sources, -1, dtype=np.intp)
+            self._source_to_view[self._view_to_source] = np.arange(len(self._view_to_source), dtype=np.intp)
+
+    def map_source_cells(self, rows: Sequence[int], cols: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """ Brings the view up to date with changes to the given cells (rows being indexes
+        into the original items) and returns where they are displayed.
+
+        Changed rows that no longer match the filters (or now do) trigger filtering again,
+        and changes to the values of the sorting column move the rows to their new position
+        (with a layout change). Cells that are not displayed are dropped.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        if self._sort_key_cache:
+            self._update_sort_key_cache(rows, cols)
+        if self._source_to_view is None or not len(rows):
+            return rows, cols
+
+        if self.filters and self._membership_changed(np.unique(rows[np.isin(cols, self._filtered_column_indexes())])):
+            self.items = self._original_items  # filter (and sort) again
+            return rows[:0], cols[:0]
+
+        if self._sort_keys is not None:
+            sort_column_indexes = [column_index for _, column_index, _ in self._sorting_columns]
+            resorted_rows = np.unique(rows[np.isin(cols, sort_column_indexes)])
+            if len(resorted_rows):
+                self._resort_rows(resorted_rows)
+
+        view_rows = self._source_to_view[rows]
+        displayed = view_rows >= 0
+        return view_rows[displayed], cols[displayed]
+
+    def _filtered_column_indexes(self) -> List[int]:
+        return [i for i, column in enumerate(self.columns) if column in self.filters]
+
+    def _membership_changed(self, source_rows: np.ndarray) -> bool:
+        for source_row in source_rows.tolist():
+            is_displayed = self._source_to_view[source_row] >= 0
+            if self.filters.filter(self._original_items[source_row]) != is_displayed:
+                return True
+        return False
+
+    def _resort_rows(self, source_rows: np.ndarray) -> None:
+        """ Moves the given (displayed) rows to their position according to their new sort keys. """
+        view_rows = self._source_to_view[source_rows]
+        view_rows = view_rows[view_rows >= 0]
+        if not len(view_rows):
+            return
+
+        # sorting native keys from scratch only takes milliseconds
+        if isinstance(self._sort_keys, np.ndarray) or len(view_rows) > len(self._view_to_source) * INCREMENTAL_SORT_MAX_FRACTION:
+            self._change_layout(self._sort_view)
+        else:
+            self._change_layout(partial(self._move_sorted_rows, view_rows))
+
+    def _move_sorted_rows(self, view_rows: np.ndarray) -> None:
+        kept = np.ones(len(self._view_to_source), dtype=bool)
+        kept[view_rows] = False
+        kept = np.flatnonzero(kept)
+        keys = [self._sort_keys[i] for i in kept.tolist()]
+        sources = self._view_to_source[kept].tolist()
+
+        moved = self._view_to_source[view_rows]
+        for source_row, key in zip(moved.tolist(), self._python_sort_keys(moved)):
+            position = bisect.bisect_right(keys, key)
+            keys.insert(position, key)
+            sources.insert(position, source_row)
+
+        self._set_view_rows(np.asarray(sources, dtype=np.intp))
+        self._sort_keys = keys
+
+    def _change_layout(self, rearrange: Callable[[], None], moved_sources: Optional[np.ndarray] = None) -> None:
+        """ Runs rearrange() (which reorders the view rows) inside a layout change,
+        keeping the persistent indexes (selection, current cell) on their rows.
+        If the source rows move too, moved_sources gives the new source row of each
+        previous one (-1 for the rows gone).
+        """
+        self.layoutAboutToBeChanged.emit()
+        old_view_to_source = self._view_to_source
+        rearrange()
+        persistent = self.persistentIndexList()
+        rows = np.fromiter((index.row() for index in persistent), dtype=np.intp, count=len(persistent))
+        if old_view_to_source is not None:
+            rows = old_view_to_source[rows]
+        if moved_sources is not None:
+            rows = moved_sources[rows]
+        if self._source_to_view is not None:
+            rows = np.where(rows >= 0, self._source_to_view[rows], -1)
+        moved = [self.index(row, index.column()) if row >= 0 else QModelIndex()
+                 for row, index in zip(rows.tolist(), persistent)]
+        self.changePersistentIndexList(persistent, moved)
+        self.layoutChanged.emit()
 
     def setData(self, index: QModelIndex, value: Any, role: int) -> bool:
         if index.column() == 0 and role == Qt.CheckStateRole and self.checkable:
@@ -377,16 +1098,16 @@ class QTableModel(QAbstractTableModel):
             if role == Qt.DisplayRole:
                 column = self.columns[section - offset]  # O(1)
                 if column.title is not None:
-                    return column.title
+                    return column.title + self._sort_indicator(column)
             elif role == Qt.TextAlignmentRole:
                 column = self.columns[section - offset]  # O(1)
-                if len(self):
-                    first_item = self.items[0]
-                    align = column.get_align(first_item)
-                else:
-                    if (align := column.align) is AUTO_ALIGN:
+                if column.align is MIXED_ALIGN:
+                    if len(self):
+                        align = column.get_align(self.convert_item(self.items[0]))
+                    else:
                         align = Alignment.LEFT
-                return to_qt_alignment(align)
+                    return to_qt_alignment(align)
+                return self._get_column_alignment(column)
             elif role == Qt.ForegroundRole:
                 column = self.columns[section - offset]  # O(1)
                 if column in self.filters:
@@ -400,6 +1121,28 @@ class QTableModel(QAbstractTableModel):
         return super().headerData(section, orientation, role)
 
     # QTableModel interface -------------------------------------------------------------------------------------------
+
+    @property
+    def columns(self) -> List[Column]:
+        return self._columns
+
+    @columns.setter
+    def columns(self, columns: List[Column]) -> None:
+        self._columns = columns
+        self._sort_key_cache = {}
+        if self._cancel_background_sort():  # its keys are those of the previous columns
+            self._sorting_state_changed(was_sorting=True)
+        self._compile_role_handlers()
+
+    @property
+    def checkable(self) -> bool:
+        return self._checkable
+
+    @checkable.setter
+    def checkable(self, checkable: bool) -> None:
+        self._checkable = checkable
+        self._compile_role_handlers()
+
     def get_column_by_index(self, index: int) -> Column:
         offset = 1 if self.checkable else 0
         return self.columns[max(index - offset, 0)]  # TODO: properly address checkable column here
@@ -414,20 +1157,71 @@ class QTableModel(QAbstractTableModel):
             return column.get_value(item)
 
     @property
-    def items(self) -> List[Any]:
-        """ read from the filtered items """
-        return self._filtered_items
+    def items(self) -> Sequence[Any]:
+        """ read from the filtered items (a view of the original items while filtered or sorted) """
+        return self._original_items if self._view_to_source is None else self._view_items
 
     @items.setter
     def items(self, items: Iterable[Any]) -> None:
         """ write to the original items (not filtered) """
-        self._original_items = items
+        previous, self._original_items = self._original_items, items
+        self._enable_change_tracking()
+        if (moved_sources := self._previous_rows(previous, items)) is not None:
+            self._change_layout(partial(self._rebuild_view, moved_sources), moved_sources)
+            return
         self._apply_filters()
         try:
             self._apply_sorting()
         except (IndexError, KeyError) as ex:
             print('it was not possible to re-apply sorting configuration: {ex}')
 
+    def _previous_rows(self, previous: Optional[Sequence[Any]], items: Sequence[Any]) -> Optional[np.ndarray]:
+        """ The new source row of each of the previous items (-1 for the ones gone), if enough of the
+        new items (see MIN_ITEMS_OVERLAP) were already there. Items are matched by identity, and
+        the rows of DataFrameProxy items by their (unique) index labels.
+        """
+        if previous is None or not len(previous) or not len(items):
+            return None
+        if isinstance(previous, DataFrameProxy) and isinstance(items, DataFrameProxy):
+            if not (previous.index.is_unique and items.index.is_unique):
+                return None
+            moved_sources = items.index.get_indexer(previous.index).astype(np.intp)
+        elif isinstance(previous, DataFrameProxy) or isinstance(items, DataFrameProxy):
+            return None
+        else:
+            new_rows = {id(item): row for row, item in enumerate(items)}
+            moved_sources = np.fromiter((new_rows.get(id(item), -1) for item in previous),
+                                        dtype=np.intp, count=len(previous))
+        if np.count_nonzero(moved_sources >= 0) < len(items) * MIN_ITEMS_OVERLAP:
+            return None
+        return moved_sources
+
+    def _rebuild_view(self, moved_sources: np.ndarray) -> None:
+        """ Filters and sorts the (new) items again, sorting only the rows that are new, changed
+        (their sort keys) or newly displayed and merging them with the others, which keep their
+        previous order.
+        """
+        old_view_to_source, old_keys = self._view_to_source, self._sort_keys
+        self.refresh_filtered_items()
+        if not self._refresh_sorting_columns():
+            return
+        if not isinstance(old_keys, list) or old_view_to_source is None:
+            self._sort_view()  # native keys (sorted from scratch in milliseconds), or not sorted before
+            return
+
+        source_rows = self._view_source_rows()
+        keys = dict(zip(source_rows.tolist(), self._python_sort_keys(source_rows)))
+        kept = []  # (key, row) of the rows still displayed with the same key, in their previous order
+        for row, old_key in zip(moved_sources[old_view_to_source].tolist(), old_keys):
+            if row >= 0 and (key := keys.get(row)) is not None and key == old_key:
+                kept.append((key, row))
+                del keys[row]
+        others = sorted(((key, row) for row, key in keys.items()), key=operator.itemgetter(0))
+        merged = list(heapq.merge(kept, others, key=operator.itemgetter(0)))
+
+        self._set_view_rows(np.fromiter((row for _, row in merged), dtype=np.intp, count=len(merged)))
+        self._sort_keys = [key for key, _ in merged]
+
     def set_filter(self, column: Column, expression: str) -> None:
         filter = Filter(column, expression)
         self.filters.add_filter(filter)
@@ -443,17 +1237,365 @@ class QTableModel(QAbstractTableModel):
         self._apply_filters()
 
     def refresh_filtered_items(self) -> None:
+        """ Filters the original items again. The view only keeps the indexes of the rows displayed
+        (see items), so filtering (and sorting) never copies the items.
         """
-        the problem here is that when we are applying the filters we are
-        creating a new list - can we do that better?
-        instead we could keep the items inside a proxy object which
-        holds an internal mapping for the indexes
-        (index in the original items -> index in the filtered items)
-        """
+        self._sort_key_cache = {}  # the items (or their values) may have changed
         if self.filters:
-            self._filtered_items = list(self.filters.filter_items(self._original_items))  # TODO: we really want a list?
+            source = self._original_items
+            self._set_view_rows(np.fromiter((row for row, item in enumerate(source) if self.filters.filter(item)),
+                                            dtype=np.intp))
+        else:
+            self._set_view_rows(None)
+
+    # Streaming -------------------------------------------------------------------------------------------------------
+
+    def append_items(self, items: Union[Iterable[Any], pd.DataFrame]) -> None:
+        """ Appends rows to the table (items, or a DataFrame for a StreamingDataFrameProxy),
+        dropping the oldest rows beyond max_rows (0 for no limit).
+
+        Views are told about the rows inserted and removed (instead of a reset), so they
+        keep their scroll position and selection. Only the new rows are filtered, and in
+        a sorted view they are inserted at their position.
+        """
+        source = self._original_items
+        if isinstance(source, StreamingDataFrameProxy):
+            max_rows = min(self.max_rows, source.max_rows) if self.max_rows else source.max_rows
+            if not isinstance(items, pd.DataFrame):
+                items = pd.DataFrame(list(items), columns=source.df.columns)
+        else:
+            if not isinstance(source, list):  # rows are appended (and dropped) in place
+                source = list(source) if source is not None else []
+                self._original_items = source
+            max_rows = self.max_rows
+            items = list(items)
+
+        if max_rows and len(items) > max_rows:
+            items = items[-max_rows:] if isinstance(items, list) else items.iloc[-max_rows:]
+        overflow = len(source) + len(items) - max_rows if max_rows else 0
+        if overflow > 0:
+            self._remove_oldest(overflow)
+        if len(items):
+            self._insert_new(items)
+
+    def _remove_oldest(self, n: int) -> None:
+        source = self._original_items
+
+        if self._view_to_source is None:
+            self.beginRemoveRows(QModelIndex(), 0, n - 1)
+            _drop_oldest(source, n)
+            self.endRemoveRows()
+            return
+
+        # remove the runs of consecutive view rows showing them, last first (so the others keep their position)
+        gone = np.flatnonzero(self._view_to_source < n)
+        runs = np.split(gone, np.flatnonzero(np.diff(gone) != 1) + 1) if len(gone) else []
+        for run in reversed(runs):
+            first, last = int(run[0]), int(run[-1])
+            self.beginRemoveRows(QModelIndex(), first, last)
+            if isinstance(self._sort_keys, np.ndarray):
+                self._sort_keys = np.delete(self._sort_keys, np.s_[first:last + 1])
+            elif self._sort_keys is not None:
+                del self._sort_keys[first:last + 1]
+            self._view_to_source = np.delete(self._view_to_source, np.s_[first:last + 1])
+            self.endRemoveRows()
+
+        for keys in self._sort_key_cache.values():
+            del keys[:n]
+        _drop_oldest(source, n)
+        self._view_to_source -= n
+        self._update_source_to_view()
+
+    def _insert_new(self, items: Union[List[Any], pd.DataFrame]) -> None:
+        source = self._original_items
+        first_row = len(source)
+
+        if self._view_to_source is None:
+            self.beginInsertRows(QModelIndex(), first_row, first_row + len(items) - 1)
+            _append(source, items)
+            self.endInsertRows()
+            return
+
+        _append(source, items)  # not visible until the view rows are updated
+        if self._sort_key_cache:
+            self._update_sort_key_cache(np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), first_row)
+        selected = [row for row in range(first_row, len(source)) if self.filters.filter(source[row])]
+        if not selected:
+            self._update_source_to_view()
+            return
+
+        if (self._sort_keys is None or isinstance(self._sort_keys, np.ndarray)
+                or len(selected) > len(self._view_to_source) * INCREMENTAL_SORT_MAX_FRACTION):
+            start = len(self._view_to_source)
+            self.beginInsertRows(QModelIndex(), start, start + len(selected) - 1)
+            sort_keys = self._sort_keys
+            self._set_view_rows(np.concatenate([self._view_to_source, selected]).astype(np.intp))
+            self.endInsertRows()
+            if sort_keys is not None:
+                self._change_layout(self._sort_view)
+            return
+
+        keys = self._python_sort_keys(np.array(selected, dtype=np.intp))
+        for row, key in zip(selected, keys):
+            position = bisect.bisect_right(self._sort_keys, key)
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._sort_keys.insert(position, key)
+            self._view_to_source = np.insert(self._view_to_source, position, row)
+            self.endInsertRows()
+        self._update_source_to_view()
+
+    def _on_rows_inserted(self, parent: QModelIndex, first: int, last: int) -> None:
+        if last == self.rowCount() - 1:  # appended: only the (partial) last block of formatted rows is stale
+            self._data_generation += 1
+            self._format_blocks.invalidate_range(first, 0, last, self.columnCount())
+        else:
+            self._invalidate_caches()
+
+    # Flashing --------------------------------------------------------------------------------------------------------
+
+    @property
+    def flash_duration_ms(self) -> int:
+        """ How long the cells of DataFrameProxy sources flash after they change (0 disables flashing). """
+        return round(self._flash_duration * 1_000)
+
+    @flash_duration_ms.setter
+    def flash_duration_ms(self, duration_ms: int) -> None:
+        self._flash_duration = duration_ms / 1_000
+        self._enable_change_tracking()
+        self._compile_role_handlers()
+
+    @property
+    def flash_colors(self) -> Dict[int, QColor]:
+        """ Flash colors by direction of the change: 1 (up), -1 (down) and 0 (not numeric). """
+        return {direction: ramp[0] for direction, ramp in self._flash_ramp.items()}
+
+    @flash_colors.setter
+    def flash_colors(self, colors: Dict[int, QColor]) -> None:
+        self._flash_ramp = _make_flash_ramp({**FLASH_COLORS, **colors})
+
+    @property
+    def _flashing_source(self) -> Optional[DataFrameProxy]:
+        source = self._original_items
+        if isinstance(source, DataFrameProxy) and source.change_times is not None:
+            return source
+        return None
+
+    def _enable_change_tracking(self) -> None:
+        if self._flash_duration and isinstance(self._original_items, DataFrameProxy):
+            self._original_items.enable_change_tracking()
+
+    def is_flashing(self) -> bool:
+        """ Whether any cell is still fading. """
+        source = self._flashing_source
+        return source is not None and time.perf_counter() - source.last_change_time < self._flash_duration
+
+    def fading_cells(self, top: int, bottom: int, left: int, right: int,
+                     margin: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the (view) rows and columns of the cells of the (inclusive) range that are
+        still fading, or finished fading less than margin seconds ago.
+        """
+        no_cells = np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        if (source := self._flashing_source) is None:
+            return no_cells
+
+        offset = int(self._checkable)
+        col_indexes, df_indexes = [], []
+        for col_index in range(max(left, offset), min(right, self.columnCount() - 1) + 1):
+            if (df_index := getattr(self._columns[col_index - offset], 'df_index', None)) is not None:
+                col_indexes.append(col_index)
+                df_indexes.append(df_index)
+        view_rows = np.arange(max(top, 0), min(bottom, self.rowCount() - 1) + 1)
+        if not col_indexes or not len(view_rows):
+            return no_cells
+
+        rows = self._view_to_source[view_rows] if self._view_to_source is not None else view_rows
+        change_times = source.change_times[np.ix_(source._row_positions(rows), df_indexes)]
+        fading_rows, fading_cols = np.nonzero(time.perf_counter() - change_times < self._flash_duration + margin)
+        return view_rows[fading_rows], np.asarray(col_indexes, dtype=np.intp)[fading_cols]
+
+    # Caching ---------------------------------------------------------------------------------------------------------
+
+    @property
+    def display_cache_size(self) -> int:
+        """ Maximum number of formatted cells kept in memory (0 disables the cache). """
+        cache = self._display_cache
+        return cache.maxsize if cache is not None else 0
+
+    @display_cache_size.setter
+    def display_cache_size(self, size: int) -> None:
+        self._display_cache = CellCache(size) if size > 0 else None
+
+    @property
+    def style_cache_size(self) -> int:
+        """ Maximum number of resolved cell styles kept in memory (0 disables the cache). Cached styles
+        are dropped for the whole rows of the changed cells: set it to 0 if a cell_style callback reads
+        state outside of its row (or call refresh() when that state changes).
+        """
+        cache = self._style_cache
+        return cache.maxsize if cache is not None else 0
+
+    @style_cache_size.setter
+    def style_cache_size(self, size: int) -> None:
+        self._style_cache = CellCache(size) if size > 0 else None
+
+    def _invalidate_caches(self) -> None:
+        self._data_generation += 1
+        self._column_alignments.clear()
+        if self._style_cache is not None:
+            self._style_cache.clear()
+        self._format_blocks.clear()
+        self._image_requests.clear()
+        if self._display_cache is not None:
+            self._display_cache.clear()
+
+    def _on_rows_changed(self, *args) -> None:
+        self._rows_generation += 1
+
+    def _on_data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex, roles=()) -> None:
+        if self._sort_job is not None and (not roles or Qt.DisplayRole in roles):
+            self._note_changed_rows(top_left, bottom_right)
+        if roles and not _CACHED_ROLES.intersection(roles):
+            return
+        self._data_generation += 1
+        if top_left.isValid() and bottom_right.isValid():
+            cell_range = top_left.row(), top_left.column(), bottom_right.row(), bottom_right.column()
+            if self._style_cache is not None:
+                # a style may depend on the other columns of its row
+                self._style_cache.invalidate_range(top_left.row(), 0, bottom_right.row(), self.columnCount() - 1)
+            self._format_blocks.invalidate_range(*cell_range)
+            if self._display_cache is not None:
+                self._display_cache.invalidate_range(*cell_range)
+        else:
+            self._invalidate_caches()
+
+    def _on_image_ready(self, path: str) -> None:
+        for row, col_index in self._image_requests.pop(path, ()):
+            index = self.index(row, col_index)
+            if index.isValid():
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    # Prefetching -----------------------------------------------------------------------------------------------------
+
+    def prefetch(self, top: int, bottom: int, left: int, right: int) -> None:
+        """ Computes in the background the display strings and cell styles of the
+        (inclusive) range of cells that are not cached yet, so painting them later
+        is served from the caches (display strings need the display cache, see
+        display_cache_size). A newer request cancels the previous one.
+
+        Note: the column getters, fmt and cell_style callbacks run in a worker thread.
+        """
+        if self._prefetch_job is not None:
+            self._prefetch_job.cancelled = True
+            self._prefetch_job = None
+
+        offset = int(self._checkable)
+        bottom = min(bottom, self.rowCount() - 1)
+        right = min(right, self.columnCount() - 1)
+        display_cache = self._display_cache
+        style_cache = self._style_cache
+        items = self.items
+        cells = []
+        for col_index in range(max(left, offset), right + 1):
+            column = self._columns[col_index - offset]
+            columnar = self._is_columnar_source and getattr(column, 'df_index', None) is not None
+            for row in range(max(top, 0), bottom + 1):
+                key = (row, col_index)
+                needs_display = display_cache is not None and not columnar and key not in display_cache
+                needs_style = style_cache is not None and column.cell_style is not None and key not in style_cache
+                if needs_display or needs_style:
+                    item = items[row]
+                    context = None
+                    if needs_style:  # given the item, so the worker thread does not read the (live) items
+                        context = self._make_context(self.index(row, col_index), Qt.FontRole, col_index, column,
+                                                     raw_item=item)
+                    cells.append((row, col_index, column, item, needs_display, context))
+
+        if cells:
+            self._prefetch_job = _PrefetchJob(self, self._data_generation, cells)
+            QThreadPool.globalInstance().start(self._prefetch_job)
+
+    def _on_prefetched(self, generation: int, displayed: Dict, styles: Dict) -> None:
+        if generation != self._data_generation:
+            return  # the data changed while the job was running - results may be stale
+        self._prefetch_job = None
+        if (display_cache := self._display_cache) is not None:
+            for key, value in displayed.items():
+                display_cache.put(key, value)
+        if (style_cache := self._style_cache) is not None:
+            for key, style in styles.items():
+                style_cache.put(key, style)
+        self.prefetchFinished.emit()
+
+    # Background sorting ----------------------------------------------------------------------------------------------
+
+    def _sorts_in_background(self, sorting_columns: List[Tuple[Column, int, Any]]) -> bool:
+        min_rows = self.background_sort_min_rows
+        return (bool(min_rows) and self.items is not None and len(self.items) >= min_rows
+                and any(self._native_column(column) is None for column, _, _ in sorting_columns))
+
+    def _start_background_sort(self, sorting_columns: List[Tuple[Column, int, Any]]) -> None:
+        """ Sorts the view by the given columns in a worker thread, the view keeping the current
+        order (and sorting columns) until the new order is applied, in one layout change.
+        """
+        indexes = {column_index for _, column_index, _ in sorting_columns}
+        sort_key_cache = {i: keys for i, keys in self._sort_key_cache.items() if i in indexes}
+        self._sort_job = _SortJob(self, self._rows_generation, sorting_columns,
+                                  self._view_source_rows().copy(), sort_key_cache)
+        QThreadPool.globalInstance().start(self._sort_job)
+
+    def _cancel_background_sort(self) -> bool:
+        """ Drops the running background sort, if any (returns whether there was one). """
+        if self._sort_job is None:
+            return False
+        self._sort_job.cancelled = True
+        self._sort_job = None
+        return True
+
+    def _on_sorted(self, job: _SortJob) -> None:
+        if job is not self._sort_job:
+            return  # superseded by a newer sort (or cancelled)
+        if job.order is None:
+            self._set_sorting_columns(job.sorting_columns, background=False)  # the error is reported here
+        elif job.rows_generation != self._rows_generation:
+            self._start_background_sort(job.sorting_columns)  # rows were inserted or removed meanwhile - start over
+        else:
+            self._sort_job = None
+            self._sorting_columns = job.sorting_columns
+            self._sort_key_cache = job.sort_key_cache
+            self._change_layout(partial(self._set_view_order, job.source_rows, job.order, job.sort_keys))
+            if job.changed_rows:
+                # the job may have read the previous values of these rows
+                changed = np.fromiter(job.changed_rows, dtype=np.intp, count=len(job.changed_rows))
+                cols = np.fromiter(self._sort_key_cache, dtype=np.intp, count=len(self._sort_key_cache))
+                self._update_sort_key_cache(np.repeat(changed, len(cols)), np.tile(cols, len(changed)))
+                self._resort_rows(changed)
+            self._sorting_state_changed(was_sorting=True)
+
+    def _note_changed_rows(self, top_left: QModelIndex, bottom_right: QModelIndex) -> None:
+        """ Notes the source rows of a dataChanged range for the running background sort (all the
+        view rows for an invalid range).
+        """
+        if top_left.isValid() and bottom_right.isValid():
+            rows = np.arange(top_left.row(), bottom_right.row() + 1, dtype=np.intp)
+            if self._view_to_source is not None:
+                rows = self._view_to_source[rows]
         else:
-            self._filtered_items = self._original_items
+            rows = self._view_source_rows()
+        self._sort_job.changed_rows.update(rows.tolist())
+
+    # Profiling -------------------------------------------------------------------------------------------------------
+
+    def profiling_snapshot(self) -> StatsSnapshot:
+        """ Per column and role timings of data(), for the columns with collect_stats=True. """
+        return snapshot_columns(self.columns)
+
+    def reset_profiling(self) -> None:
+        for column in self.columns:
+            column.reset_stats()
+
+    def export_profiling(self, file: Union[str, TextIO], format: Optional[str] = None) -> None:
+        """ Exports profiling_snapshot() to a 'json' or 'csv' file. """
+        export_stats(self.profiling_snapshot(), file, format)
 
     def _create_font(self, bold: bool = False) -> QFont:
         font = QFont(DEFAULT_FONT_NAME)
@@ -564,6 +1706,9 @@ class QTable(QTableView):
     #: signal to notify whenever the checked items change
     on_checked_items: Signal = Signal(set)
 
+    #: emitted after the cells in the viewport have been painted
+    painted: Signal = Signal()
+
     def __init__(self,
                  columns: List[Column],
                  items: Optional[List[Any]] = None,
@@ -575,6 +1720,12 @@ class QTable(QTableView):
                  sortable: bool = True,
                  parent: QObject = None,
                  convert_item = None,
+                 display_cache_size: int = 0,
+                 style_cache_size: int = STYLE_CACHE_SIZE,
+                 prefetch_margin: int = 0,
+                 max_rows: int = 0,
+                 flash_duration_ms: int = 0,
+                 nan_position: str = 'smallest',
                  ):
         super().__init__(parent=parent)
         self.columns = columns
@@ -585,7 +1736,9 @@ class QTable(QTableView):
         self.setAlternatingRowColors(alternate_row_colors)
         self.doubleClicked.connect(self.on_double_clicked)
         model = QTableModel(self.columns, self.items, checkable=checkable, checked_items=checked_items,
-                            convert_item=convert_item)
+                            convert_item=convert_item, display_cache_size=display_cache_size,
+                            style_cache_size=style_cache_size, max_rows=max_rows,
+                            flash_duration_ms=flash_duration_ms, nan_position=nan_position)
         model.on_checked_items.connect(self.on_model_checked_items_changed)
         self.setModel(model)
         self.verticalHeader().setDefaultSectionSize(DEFAULT_ROW_HEIGHT)
@@ -603,9 +1756,30 @@ class QTable(QTableView):
         h_header.setSectionsClickable(True)
         h_header.setSortIndicatorShown(True)
         self.setHorizontalHeader(h_header)
+        model.backgroundSortChanged.connect(self._on_background_sort_changed)
 
         self.__selection_mode_override = None
 
+        # refresh_cells() falls back to one dataChanged for the bounding range beyond these
+        self.max_refresh_ranges = DEFAULT_MAX_REFRESH_RANGES
+        self.refresh_viewport_threshold = DEFAULT_REFRESH_VIEWPORT_THRESHOLD
+
+        # Prefetching of the visible window (plus a margin of rows) - coalesced with a zero timer
+        self._prefetch_margin = 0
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.timeout.connect(self.prefetch_visible_window)
+
+        # Repaints the flashing cells while they fade (only runs while some cell is fading)
+        self._flash_timer = QTimer(self)
+        self._flash_timer.setInterval(FLASH_FRAME_MS)
+        self._flash_timer.timeout.connect(self._repaint_fading_cells)
+        self.verticalScrollBar().valueChanged.connect(self._schedule_prefetch)
+        self.horizontalScrollBar().valueChanged.connect(self._schedule_prefetch)
+        model.modelReset.connect(self._schedule_prefetch)
+        model.layoutChanged.connect(self._schedule_prefetch)
+        self.prefetch_margin = prefetch_margin
+
     def keyPressEvent(self, event: QEvent):
         """ Supports copying when multiple cells are selected. """
         if event.matches(QKeySequence.Copy):
@@ -642,6 +1816,13 @@ class QTable(QTableView):
     def clear_filters(self):
         self.model().clear_filters()
 
+    def _on_background_sort_changed(self, sorting: bool) -> None:
+        # the titles of the columns being sorted by also get SORT_BUSY_INDICATOR (see QTableModel.headerData)
+        if sorting:
+            self.horizontalHeader().setCursor(Qt.BusyCursor)
+        else:
+            self.horizontalHeader().unsetCursor()
+
     @property
     def columns(self) -> List[Column]:
         return self._columns
@@ -672,6 +1853,96 @@ class QTable(QTableView):
     def checkable(self, checkable: bool):
         self.model().checkable = checkable
 
+    @property
+    def max_rows(self) -> int:
+        """ Maximum number of rows kept by append_items() (0 for no limit). """
+        return self.model().max_rows
+
+    @max_rows.setter
+    def max_rows(self, max_rows: int) -> None:
+        self.model().max_rows = max_rows
+
+    @property
+    def nan_position(self) -> str:
+        """ Where NaN values go when sorting: 'smallest' (below any value), 'first' or 'last'. """
+        return self.model().nan_position
+
+    @nan_position.setter
+    def nan_position(self, nan_position: str) -> None:
+        self.model().nan_position = nan_position
+
+    def append_items(self, items: Iterable[Any]) -> None:
+        """ Appends rows (see QTableModel.append_items()), keeping the scroll position and selection. """
+        m = self.model()
+        m.append_items(items)
+        self._items = m._original_items  # the same list, unless it had to be turned into one
+
+    @property
+    def display_cache_size(self) -> int:
+        return self.model().display_cache_size
+
+    @display_cache_size.setter
+    def display_cache_size(self, size: int) -> None:
+        self.model().display_cache_size = size
+
+    @property
+    def style_cache_size(self) -> int:
+        return self.model().style_cache_size
+
+    @style_cache_size.setter
+    def style_cache_size(self, size: int) -> None:
+        self.model().style_cache_size = size
+
+    @property
+    def prefetch_margin(self) -> int:
+        """ Number of rows above and below the visible ones that get prefetched in
+        the background (0 disables prefetching). Prefetched display strings are only
+        kept with a display cache (see display_cache_size). The column getters, fmt
+        and cell_style callbacks are then also called from a worker thread.
+        """
+        return self._prefetch_margin
+
+    @prefetch_margin.setter
+    def prefetch_margin(self, margin: int) -> None:
+        self._prefetch_margin = margin
+        if margin > 0:
+            self._schedule_prefetch()
+
+    def visible_window(self) -> Optional[Tuple[int, int, int, int]]:
+        """ Returns (top, bottom, left, right) of the cells visible in the viewport. """
+        viewport = self.viewport()
+        top = self.rowAt(0)
+        left = self.columnAt(0)
+        if top == -1 or left == -1:
+            return None
+        bottom = self.rowAt(viewport.height() - 1)
+        if bottom == -1:
+            bottom = self.model().rowCount() - 1
+        right = self.columnAt(viewport.width() - 1)
+        if right == -1:
+            right = self.model().columnCount() - 1
+        return top, bottom, left, right
+
+    def prefetch_visible_window(self) -> None:
+        if self._prefetch_margin and (window := self.visible_window()) is not None:
+            top, bottom, left, right = window
+            margin = self._prefetch_margin
+            self.model().prefetch(max(top - margin, 0), bottom + margin, left, right)
+
+    def _schedule_prefetch(self, *args) -> None:
+        if self._prefetch_margin and not self._prefetch_timer.isActive():
+            self._prefetch_timer.start(0)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._schedule_prefetch()
+
+    def viewportEvent(self, event: QEvent) -> bool:
+        handled = super().viewportEvent(event)
+        if event.type() == QEvent.Paint:
+            self.painted.emit()
+        return handled
+
     @property
     def sortable(self) -> bool:
         return self.isSortingEnabled()
@@ -711,12 +1982,87 @@ class QTable(QTableView):
         m.dataChanged.emit(top_left, bottom_right)
 
     def refresh_one_cell(self, row: int, col: int) -> None:
-        # how about filtering and sorting here?
-        # perhaps we can say that ticking tables cannot be filtered or sorted?
+        # row is a view row: use refresh_source_cells() for rows of the (unfiltered, unsorted) items
         m = self.model()
+        m.refresh_view_cells(np.array([row], dtype=np.intp), np.array([col], dtype=np.intp))
         index = m.index(row, col)
-        index2 = m.index(row, col+1)
-        m.dataChanged.emit(index, index2)
+        m.dataChanged.emit(index, index)
+
+    def refresh_cells(self, rows: Sequence[int], cols: Sequence[int]) -> None:
+        """ Notifies the view that the given cells (parallel sequences of row and column
+        indexes) changed, with as few dataChanged signals as possible.
+
+        Cells are merged into rectangular ranges. When that still yields more than
+        max_refresh_ranges ranges, or when the changed cells cover most of the visible
+        area (refresh_viewport_threshold), a single dataChanged for the bounding
+        range of all the cells is emitted instead.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        self.model().refresh_view_cells(rows, cols)
+        self._emit_changed_cells(rows, cols)
+
+    def _emit_changed_cells(self, rows: np.ndarray, cols: np.ndarray) -> None:
+        if not len(rows):
+            return
+
+        m = self.model()
+        if self._most_of_viewport_changed(rows, cols):
+            ranges = None
+        else:
+            ranges = coalesce_cells(rows, cols)
+            if len(ranges) > self.max_refresh_ranges:
+                ranges = None
+
+        if ranges is None:
+            ranges = [(int(rows.min()), int(cols.min()), int(rows.max()), int(cols.max()))]
+
+        for top, left, bottom, right in ranges:
+            m.dataChanged.emit(m.index(top, left), m.index(bottom, right))
+
+        if m.flash_duration_ms and not self._flash_timer.isActive():
+            self._flash_timer.start()
+
+    @property
+    def flash_duration_ms(self) -> int:
+        """ How long the changed cells of DataFrame backed tables flash (0 disables flashing). """
+        return self.model().flash_duration_ms
+
+    @flash_duration_ms.setter
+    def flash_duration_ms(self, duration_ms: int) -> None:
+        self.model().flash_duration_ms = duration_ms
+
+    def _repaint_fading_cells(self) -> None:
+        m = self.model()
+        if (window := self.visible_window()) is not None:
+            # include the cells that finished fading since the last frame, to paint them without the flash
+            rows, cols = m.fading_cells(*window, margin=2 * FLASH_FRAME_MS / 1_000)
+            viewport = self.viewport()
+            for top, left, bottom, right in coalesce_cells(rows, cols):
+                rect = self.visualRect(m.index(top, left)).united(self.visualRect(m.index(bottom, right)))
+                viewport.update(rect)
+        if not m.is_flashing():
+            self._flash_timer.stop()
+
+    def refresh_source_cells(self, rows: Sequence[int], cols: Sequence[int]) -> None:
+        """ Same as refresh_cells(), with rows given as indexes into the original items
+        (e.g. rows of the frame of a ticking DataFrame): the changes are mapped through
+        the filtering and sorting of the view, re-sorting the changed rows if needed.
+        """
+        self._emit_changed_cells(*self.model().map_source_cells(rows, cols))  # the sort keys are refreshed there
+
+    def _most_of_viewport_changed(self, rows: np.ndarray, cols: np.ndarray) -> bool:
+        if (window := self.visible_window()) is None:
+            return False
+        top, bottom, left, right = window
+        area = (bottom - top + 1) * (right - left + 1)
+        visible = (rows >= top) & (rows <= bottom) & (cols >= left) & (cols <= right)
+        if np.count_nonzero(visible) < area * self.refresh_viewport_threshold:
+            return False
+        # count each visible cell only once
+        n_rows = bottom - top + 1
+        n_changed = len(np.unique((cols[visible] - left) * n_rows + (rows[visible] - top)))
+        return n_changed >= area * self.refresh_viewport_threshold
 
     def set_selection_mode(self, selection_mode: SelectionMode):
         if selection_mode == SelectionMode.SINGLE_CELL:
@@ -1015,6 +2361,19 @@ class QFilterableHeaderView(QHeaderView):
             filter_widget = QFilterWidget(column, self.filter_callback, model.filters, parent=table)
             filter_widget.show(event.globalPos())
 
+        elif event.button() == Qt.LeftButton and event.modifiers() & Qt.ShiftModifier:
+            table: QTable = self.parent()
+            column_index = self.logicalIndexAt(event.pos())
+            if table.isSortingEnabled() and self.sectionsClickable() and column_index >= 0:
+                # multi-column sort: not a plain click, which would sort by this column alone
+                model: QTableModel = table.model()
+                model.add_sort_column(column_index)
+                primary_index, primary_order = model.sort_columns[0]
+                self.blockSignals(True)  # the view would sort again (by that column alone)
+                self.setSortIndicator(primary_index, primary_order)
+                self.blockSignals(False)
+                return
+
         return super().mousePressEvent(event)
 
     def filter_callback(self, column: Column, expression: str):
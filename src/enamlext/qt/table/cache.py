@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+
+
+CellKey = Tuple[int, int]  # (row, column)
+
+
+class CellCache:
+    """ Bounded LRU cache of per-cell values keyed by (row, column).
+
+    The model owns one of these for each kind of value it wants to avoid
+    recomputing during paints (e.g. formatted display strings). It does not
+    know anything about staleness: the model is responsible for calling
+    invalidate_range() / clear() whenever it notifies the views that data
+    has changed.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize <= 0:
+            raise ValueError(f'CellCache maxsize must be positive, got: {maxsize}')
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: CellKey, default: Any = None) -> Any:
+        try:
+            value = self._data[key]
+        except KeyError:
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: CellKey, value: Any) -> None:
+        data = self._data
+        data[key] = value
+        data.move_to_end(key)
+        if len(data) > self.maxsize:
+            data.popitem(last=False)  # evict the least recently used
+
+    def invalidate(self, key: CellKey) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_range(self, top: int, left: int, bottom: int, right: int) -> None:
+        """ Drops every cached cell inside the (inclusive) rectangle. """
+        n_cells = (bottom - top + 1) * (right - left + 1)
+        data = self._data
+        if n_cells <= len(data):
+            for row in range(top, bottom + 1):
+                for column in range(left, right + 1):
+                    data.pop((row, column), None)
+        else:
+            # cheaper to scan what we have than to probe every cell of the range
+            stale = [(row, column) for row, column in data
+                     if top <= row <= bottom and left <= column <= right]
+            for key in stale:
+                del data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class BlockCache(CellCache):
+    """ Bounded LRU cache of values computed for whole blocks of rows at once,
+    keyed by (block number, column).
+    """
+
+    def __init__(self, maxsize: int, block_size: int):
+        super().__init__(maxsize)
+        self.block_size = block_size
+
+    def invalidate_range(self, top: int, left: int, bottom: int, right: int) -> None:
+        first_block, last_block = top // self.block_size, bottom // self.block_size
+        data = self._data
+        stale = [(block, column) for block, column in data
+                 if first_block <= block <= last_block and left <= column <= right]
+        for key in stale:
+            del data[key]
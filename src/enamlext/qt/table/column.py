@@ -1,14 +1,17 @@
 import datetime
+import weakref
 from enum import Enum
 from numbers import Number
 from operator import itemgetter
-from typing import Union, Callable, Optional, Any, Sequence, Mapping, List, Dict, Container
+from typing import Union, Callable, Optional, Any, Sequence, Mapping, List, Dict, Container, Tuple
 
+import numpy as np
 from qtpy.QtCore import Qt
 from qtpy.QtGui import QColor
 
 from enamlext.qt.qt_dataframe import DataFrameProxy
 from enamlext.qt.table.defs import CellStyle, ColumnSize
+from enamlext.qt.table.profiling import ColumnStats, CallbackTimer
 from enamlext.qt.table.table_context import TableContext
 
 
@@ -18,7 +21,11 @@ class Alignment(str, Enum):
     RIGHT = "right"
 
 
-AUTO_ALIGN = object()  # sentinel
+AUTO_ALIGN = object()  # sentinel - alignment inferred once for the whole column
+MIXED_ALIGN = object()  # sentinel - alignment resolved for each cell based on its value
+
+# number of rows inspected when inferring the alignment of AUTO_ALIGN columns
+ALIGN_SAMPLE_SIZE = 20
 
 
 class Column:
@@ -48,23 +55,63 @@ class Column:
         self.image = image
         if cell_style is not None:
             self.get_cell_style = cell_style
+        self.stats = ColumnStats()
+        self.callback_timer = None
+        self._collect_stats = False
+        self._uninstrumented = None  # the callbacks as they were before being timed
+        self._stats_observers = weakref.WeakSet()  # e.g. the models displaying the column
         self.collect_stats = collect_stats
-        self.stats = {}
 
-    def record_stats(self, role: int, elapsed: float):
-        if role not in self.stats:
-            self.stats[role] = {'n_calls': 0, 'cum_time': 0, 'avg_time': 0}
+    @property
+    def collect_stats(self) -> bool:
+        """ Whether the timings of the data() requests for this column are recorded in stats
+        (it can be turned on and off at any time).
+        """
+        return self._collect_stats
+
+    @collect_stats.setter
+    def collect_stats(self, collect_stats: bool) -> None:
+        if collect_stats and self._uninstrumented is None:
+            self._instrument_callbacks()
+        elif not collect_stats and self._uninstrumented is not None:
+            self.get_value, self.fmt, self.tooltip, self.get_cell_style = self._uninstrumented
+            self._uninstrumented = None
+        changed = collect_stats != self._collect_stats
+        self._collect_stats = collect_stats
+        if changed:
+            for observer in list(self._stats_observers):
+                observer.collect_stats_changed(self)
+
+    def observe_collect_stats(self, observer) -> None:
+        """ Calls observer.collect_stats_changed(column) whenever collect_stats changes
+        (the observer is only weakly referenced).
+        """
+        self._stats_observers.add(observer)
+
+    def _instrument_callbacks(self) -> None:
+        """ Times the user code called by this column (getter, fmt, tooltip and cell_style
+        callbacks) separately from the rest of the work done to answer data() requests.
+        """
+        self._uninstrumented = self.get_value, self.fmt, self.tooltip, self.get_cell_style
+        if self.callback_timer is None:
+            self.callback_timer = CallbackTimer()
+        timer = self.callback_timer
+        self.get_value = timer.wrap(self.get_value)
+        if callable(self.fmt):
+            self.fmt = timer.wrap(self.fmt)
+        if callable(self.tooltip):
+            self.tooltip = timer.wrap(self.tooltip)
+        if self.cell_style is not None:
+            self.get_cell_style = timer.wrap(self.get_cell_style)
 
-        stats_for_role = self.stats[role]
-        stats_for_role['n_calls'] += 1
-        stats_for_role['cum_time'] += elapsed
-        stats_for_role['avg_time'] = stats_for_role['cum_time'] / stats_for_role['n_calls']
+    def record_stats(self, role: int, elapsed: float, callback_elapsed: float = 0.0):
+        self.stats.record(role, elapsed, callback_elapsed)
 
-    def total_cost(self):
-        if not self.stats:
-            return 0
+    def total_cost(self) -> float:
+        return self.stats.total_cost()
 
-        return sum((stats['cum_time'] for stats in self.stats))
+    def reset_stats(self) -> None:
+        self.stats.reset()
 
     def _link_get_value_method(self, key, use_getitem):
         if callable(key):
@@ -105,16 +152,31 @@ class Column:
             return self.cell_style(table_context) or CellStyle()
 
     def get_align(self, item: Any) -> Alignment:
-        if self.align is AUTO_ALIGN:
-            # TODO: consider shortcircuiting this - maybe
-            #       maybe this should only be done once, for the first time - then shortcircuit
-            #       or maybe the user wants to have mixed alignments on the same column, so it can provide a callback
+        if self.align is AUTO_ALIGN or self.align is MIXED_ALIGN:
             value = self.get_value(item)
             align = self.resolve_column_alignment_based_on_value(value)
             return align
         else:
             return self.align
 
+    def infer_align(self, items: Sequence, convert: Callable = lambda item: item,
+                    sample_size: int = ALIGN_SAMPLE_SIZE) -> Alignment:
+        """ Resolves the alignment of an AUTO_ALIGN column as a whole: from the dtype
+        when the items are a DataFrameProxy, otherwise from the first non-null value
+        found in a sample of the items.
+        """
+        if self.align is not AUTO_ALIGN and self.align is not MIXED_ALIGN:
+            return self.align
+
+        if isinstance(items, DataFrameProxy) and (df_index := getattr(self, 'df_index', None)) is not None:
+            return resolve_column_alignment_based_on_dtype(items.df.dtypes.iloc[df_index])
+
+        for i in range(min(len(items), sample_size)):
+            if (value := self.get_value(convert(items[i]))) is not None:
+                return self.resolve_column_alignment_based_on_value(value)
+
+        return Alignment.LEFT
+
     def resolve_column_alignment_based_on_value(self, value: Any) -> Alignment:
         if isinstance(value, Number):
             return Alignment.RIGHT
@@ -130,6 +192,16 @@ class Column:
             return str(self.image)
 
 
+def resolve_column_alignment_based_on_dtype(dtype) -> Alignment:
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(dtype):
+        return Alignment.RIGHT
+    elif pd.api.types.is_datetime64_any_dtype(dtype):
+        return Alignment.CENTER
+    else:
+        return Alignment.LEFT
+
+
 # Auto-Generation of Columns
 
 def make_title(title: str):
@@ -304,3 +376,43 @@ def generate_columns(items: Sequence, *, hints: Optional[Dict] = None,
 
     ordered_columns = [columns[c] for c in sorted(columns)]
     return ordered_columns
+
+
+class DataFrameColumnLookup:
+    """ Maps the cells of a DataFrame (positional column indexes) to the view columns displaying
+    them. Columns are matched by df_index (see generate_columns()), else by key (a column label,
+    or a column position) - a DataFrame column can be displayed by several view columns, or by
+    none (its cells are skipped).
+    """
+
+    def __init__(self, columns: Sequence[Column], df_columns: Sequence):
+        positions = {label: i for i, label in enumerate(df_columns)}
+        pairs = []  # (df column index, view column index)
+        for view_index, column in enumerate(columns):
+            if (df_index := getattr(column, 'df_index', None)) is None:
+                df_index = self._df_index_of_key(column.key, positions, len(df_columns))
+            if df_index is not None:
+                pairs.append((df_index, view_index))
+        pairs.sort()
+        self._df_indexes = np.array([df_index for df_index, _ in pairs], dtype=np.intp)
+        self._view_indexes = np.array([view_index for _, view_index in pairs], dtype=np.intp)
+
+    @staticmethod
+    def _df_index_of_key(key: Any, positions: Dict[Any, int], n_columns: int) -> Optional[int]:
+        try:
+            if key in positions:
+                return positions[key]
+        except TypeError:
+            return None  # not hashable, e.g. a callable getter
+        if isinstance(key, (int, np.integer)) and not isinstance(key, bool) and 0 <= key < n_columns:
+            return int(key)
+        return None
+
+    def map_cells(self, row_indexes: np.ndarray, col_indexes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the (row, view column) of each displayed cell of the given (row, df column) ones. """
+        col_indexes = np.asarray(col_indexes, dtype=np.intp)
+        starts = np.searchsorted(self._df_indexes, col_indexes, side='left')
+        counts = np.searchsorted(self._df_indexes, col_indexes, side='right') - starts
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return (np.repeat(np.asarray(row_indexes, dtype=np.intp), counts),
+                self._view_indexes[np.repeat(starts, counts) + offsets])
@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from qtpy.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal
+from qtpy.QtGui import QImage, QPixmap
+
+
+DEFAULT_IMAGE_SIZE = 24
+DEFAULT_MAX_PIXMAPS = 512
+
+# Images that could not be loaded are not tried again before this many seconds (the file may show up later)
+FAILED_IMAGE_RETRY_SECONDS = 30.0
+
+ImageKey = Tuple[str, int]  # (path, target size)
+
+_MISSING = object()
+
+
+class _ImageDecoder(QRunnable):
+    """ Reads and scales one image in a worker thread.
+
+    Only QImage is safe to use outside the GUI thread, so the conversion to
+    QPixmap happens when the loader receives the decoded image.
+    """
+
+    def __init__(self, loader: 'ImageLoader', path: str, size: int, generation: int):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.size = size
+        self.generation = generation
+
+    def run(self):
+        image = QImage(self.path)
+        if not image.isNull() and (image.width() > self.size or image.height() > self.size):
+            image = image.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        try:
+            self.loader._decoded.emit(self.path, self.size, image, self.generation)
+        except RuntimeError:
+            pass  # the loader was destroyed in the meantime
+
+
+class ImageLoader(QObject):
+    """ Keeps the scaled pixmaps displayed in image columns, decoding them off
+    the GUI thread.
+
+    get() never touches the disk: it either returns the cached pixmap or a
+    transparent placeholder while the image is decoded in the thread pool.
+    imageReady is emitted (in the GUI thread) once the pixmap is available.
+    """
+
+    #: emitted with the path of an image once it has been decoded and cached
+    imageReady = Signal(str)
+
+    # internal: delivers decoded images from the worker threads (queued connection)
+    _decoded = Signal(str, int, QImage, int)
+
+    def __init__(self,
+                 size: int = DEFAULT_IMAGE_SIZE,
+                 *,
+                 max_pixmaps: int = DEFAULT_MAX_PIXMAPS,
+                 thread_pool: Optional[QThreadPool] = None,
+                 parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.size = size
+        self.max_pixmaps = max_pixmaps
+        self._pixmaps = OrderedDict()  # (path, size) -> QPixmap
+        self._failed = OrderedDict()  # (path, size) -> when it could not be loaded (see FAILED_IMAGE_RETRY_SECONDS)
+        self._pending = set()
+        self._generation = 0  # decodes started before clear() are dropped
+        self._placeholder = None
+        self._thread_pool = thread_pool if thread_pool is not None else QThreadPool.globalInstance()
+        self._decoded.connect(self._on_decoded)
+
+    def get(self, path: str) -> Optional[QPixmap]:
+        key = (path, self.size)
+        if (pixmap := self._pixmaps.get(key, _MISSING)) is not _MISSING:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        if (failed_at := self._failed.get(key)) is not None:
+            if time.monotonic() - failed_at < FAILED_IMAGE_RETRY_SECONDS:
+                return None
+            del self._failed[key]
+
+        if key not in self._pending:
+            self._pending.add(key)
+            self._thread_pool.start(_ImageDecoder(self, path, self.size, self._generation))
+
+        return self.placeholder
+
+    def is_pending(self, path: str) -> bool:
+        return (path, self.size) in self._pending
+
+    @property
+    def placeholder(self) -> QPixmap:
+        if self._placeholder is None:
+            self._placeholder = QPixmap(self.size, self.size)
+            self._placeholder.fill(Qt.transparent)
+        return self._placeholder
+
+    def clear(self) -> None:
+        self._pixmaps.clear()
+        self._failed.clear()
+        self._pending.clear()
+        self._generation += 1
+
+    def _on_decoded(self, path: str, size: int, image: QImage, generation: int) -> None:
+        if generation != self._generation:
+            return  # started before clear()
+        key = (path, size)
+        self._pending.discard(key)
+        if image.isNull():
+            cache, value = self._failed, time.monotonic()
+        else:
+            cache, value = self._pixmaps, QPixmap.fromImage(image)
+        cache[key] = value
+        if len(cache) > self.max_pixmaps:
+            cache.popitem(last=False)
+        self.imageReady.emit(path)
@@ -0,0 +1,106 @@
+import time
+from collections import deque
+from typing import Dict, Iterable
+
+from atom.api import Atom, Dict as AtomDict, Float, Int
+
+from enamlext.qt.table.profiling import PERCENTILES, percentile
+
+
+# number of latest samples kept (per metric) to compute the rolling percentiles
+MAX_METRICS_SAMPLES = 1_000
+
+# the observable metrics are refreshed at most this often (seconds), not on every tick
+METRICS_PUBLISH_INTERVAL = 0.5
+
+# ticks per second are measured over the last RATE_WINDOW seconds
+RATE_WINDOW = 5.0
+
+MetricSummary = Dict[str, float]  # {'last': ..., 'mean': ..., 'p50': ..., 'p90': ..., 'p99': ...}
+
+
+def summarize(samples: Iterable[float]) -> MetricSummary:
+    samples = list(samples)
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    summary = {'last': samples[-1], 'mean': sum(samples) / len(samples)}
+    for p in PERCENTILES:
+        summary[f'p{p}'] = percentile(ordered, p)
+    return summary
+
+
+class TickMetrics(Atom):
+    """ Live figures of a ticking (or pushed to) DataFrameProxy, meant to be observed
+    (e.g. bound to a status bar). Timings are in seconds and come as rolling summaries
+    of the latest samples (see summarize()).
+    """
+
+    #: deliveries of updates to the main thread per second
+    ticks_per_second = Float()
+
+    #: number of cells changed per delivery
+    cells_per_tick = AtomDict()
+
+    #: time spent looking for changes (diffing the frame) in the scheduler thread
+    diff_time = AtomDict()
+
+    #: time spent applying the updates (and notifying the views) in the main thread
+    apply_time = AtomDict()
+
+    #: time from the changes being detected (or pushed) to the table being repainted
+    latency = AtomDict()
+
+    #: ticks merged into a later delivery because the main thread had not caught up yet
+    conflated_ticks = Int()
+
+    #: batches of updates discarded before being applied (e.g. the proxy was deactivated)
+    dropped_ticks = Int()
+
+
+class TickMetricsRecorder:
+    """ Collects the samples behind TickMetrics, from any thread, and publishes them
+    to the observable metrics (from the main thread) at most every METRICS_PUBLISH_INTERVAL.
+    """
+
+    def __init__(self, max_samples: int = MAX_METRICS_SAMPLES):
+        self.metrics = TickMetrics()
+        self.cells = deque(maxlen=max_samples)
+        self.diff_times = deque(maxlen=max_samples)
+        self.apply_times = deque(maxlen=max_samples)
+        self.latencies = deque(maxlen=max_samples)
+        self.delivery_times = deque(maxlen=max_samples)
+        self.conflated_ticks = 0
+        self.dropped_ticks = 0
+        self._published_at = -float('inf')
+
+    def record_diff(self, elapsed: float) -> None:
+        self.diff_times.append(elapsed)
+
+    def record_delivery(self, n_cells: int, apply_time: float) -> None:
+        self.delivery_times.append(time.perf_counter())
+        self.cells.append(n_cells)
+        self.apply_times.append(apply_time)
+
+    def record_latency(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    @property
+    def ticks_per_second(self) -> float:
+        since = time.perf_counter() - RATE_WINDOW
+        return sum(1 for t in self.delivery_times if t >= since) / RATE_WINDOW
+
+    def publish(self, force: bool = False) -> None:
+        """ Refreshes the observable metrics - must be called in the main thread. """
+        now = time.perf_counter()
+        if not force and now - self._published_at < METRICS_PUBLISH_INTERVAL:
+            return
+        self._published_at = now
+        metrics = self.metrics
+        metrics.ticks_per_second = self.ticks_per_second
+        metrics.cells_per_tick = summarize(self.cells)
+        metrics.diff_time = summarize(self.diff_times)
+        metrics.apply_time = summarize(self.apply_times)
+        metrics.latency = summarize(self.latencies)
+        metrics.conflated_ticks = self.conflated_ticks
+        metrics.dropped_ticks = self.dropped_ticks
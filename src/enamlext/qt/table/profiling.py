@@ -0,0 +1,197 @@
+import csv
+import functools
+import json
+import math
+import time
+from collections import deque
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Union
+
+from qtpy.QtCore import Qt
+
+
+# number of latest timings kept (per column and role) to compute the percentiles
+MAX_SAMPLES = 10_000
+
+PERCENTILES = (50, 90, 99)
+
+ROLE_NAMES = {
+    int(Qt.DisplayRole): 'display',
+    int(Qt.DecorationRole): 'decoration',
+    int(Qt.ToolTipRole): 'tooltip',
+    int(Qt.FontRole): 'font',
+    int(Qt.TextAlignmentRole): 'alignment',
+    int(Qt.BackgroundRole): 'background',
+    int(Qt.ForegroundRole): 'foreground',
+    int(Qt.CheckStateRole): 'check_state',
+    int(Qt.SizeHintRole): 'size_hint',
+}
+
+ROLE_SNAPSHOT_FIELDS = ['n_calls', 'cum_time', 'callback_time', 'framework_time', 'avg_time',
+                        *(f'p{p}' for p in PERCENTILES), 'max_time']
+SNAPSHOT_FIELDS = ['column', 'role', *ROLE_SNAPSHOT_FIELDS]
+
+# fields of RoleStats read straight from its attributes (the percentiles need sorting the samples)
+_ROLE_FIELDS = {'n_calls', 'cum_time', 'callback_time', 'framework_time', 'avg_time', 'max_time'}
+
+StatsSnapshot = List[Dict]
+
+
+def role_name(role: int) -> str:
+    return ROLE_NAMES.get(int(role), str(int(role)))
+
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """ Nearest-rank percentile of already sorted samples. """
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+class RoleStats(Mapping):
+    """ Timings of the data() requests of one role for one column - also readable as a
+    mapping of the fields of snapshot() (e.g. stats['n_calls']).
+    """
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.n_calls = 0
+        self.cum_time = 0.0
+        self.callback_time = 0.0  # spent inside user code (getters, fmt, cell_style, tooltip...)
+        self.max_time = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def record(self, elapsed: float, callback_elapsed: float = 0.0) -> None:
+        self.n_calls += 1
+        self.cum_time += elapsed
+        self.callback_time += callback_elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+        self.samples.append(elapsed)
+
+    @property
+    def framework_time(self) -> float:
+        return self.cum_time - self.callback_time
+
+    @property
+    def avg_time(self) -> float:
+        return self.cum_time / self.n_calls if self.n_calls else 0.0
+
+    def __getitem__(self, field: str) -> Union[int, float]:
+        if field in _ROLE_FIELDS:
+            return getattr(self, field)
+        return self.snapshot()[field]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ROLE_SNAPSHOT_FIELDS)
+
+    def __len__(self) -> int:
+        return len(ROLE_SNAPSHOT_FIELDS)
+
+    def snapshot(self) -> Dict:
+        samples = sorted(self.samples)
+        result = {
+            'n_calls': self.n_calls,
+            'cum_time': self.cum_time,
+            'callback_time': self.callback_time,
+            'framework_time': self.framework_time,
+            'avg_time': self.avg_time,
+        }
+        for p in PERCENTILES:
+            result[f'p{p}'] = percentile(samples, p)
+        result['max_time'] = self.max_time
+        return result
+
+
+class ColumnStats(Mapping):
+    """ Per-role timings of the data() requests for one column (a mapping of role -> RoleStats). """
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.roles: Dict[int, RoleStats] = {}
+
+    def __getitem__(self, role: int) -> RoleStats:
+        return self.roles[role]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.roles)
+
+    def __len__(self) -> int:
+        return len(self.roles)
+
+    def record(self, role: int, elapsed: float, callback_elapsed: float = 0.0) -> None:
+        if (stats := self.roles.get(role)) is None:
+            stats = self.roles[role] = RoleStats(self.max_samples)
+        stats.record(elapsed, callback_elapsed)
+
+    def total_cost(self) -> float:
+        return sum(stats.cum_time for stats in self.roles.values())
+
+    def reset(self) -> None:
+        self.roles = {}
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {role_name(role): stats.snapshot() for role, stats in self.roles.items()}
+
+
+class CallbackTimer:
+    """ Accumulates the time spent inside user callbacks, so it can be told apart
+    from the time spent in the table machinery. Nested timed callbacks (e.g. a
+    cell_style callback reading the value through a timed getter) are only
+    counted once.
+    """
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self._depth = 0
+
+    def wrap(self, callback: Callable) -> Callable:
+        @functools.wraps(callback)
+        def timed(*args, **kwargs):
+            if self._depth:
+                return callback(*args, **kwargs)
+            self._depth += 1
+            t0 = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                self.elapsed += time.perf_counter() - t0
+                self._depth -= 1
+        return timed
+
+    def pop(self) -> float:
+        """ Returns the time accumulated since the last pop() and starts over. """
+        elapsed, self.elapsed = self.elapsed, 0.0
+        return elapsed
+
+
+def snapshot_columns(columns) -> StatsSnapshot:
+    """ Flattens the stats of the given columns into one row per (column, role). """
+    rows = []
+    for column in columns:
+        if not column.collect_stats:
+            continue
+        for role, stats in column.stats.snapshot().items():
+            rows.append({'column': column.title, 'role': role, **stats})
+    return rows
+
+
+def export_stats(snapshot: StatsSnapshot, file: Union[str, Path, TextIO], format: Optional[str] = None) -> None:
+    """ Writes a stats snapshot as 'json' or 'csv' (by default inferred from the file name). """
+    if format is None:
+        name = file if isinstance(file, (str, Path)) else getattr(file, 'name', '')
+        format = 'csv' if str(name).lower().endswith('.csv') else 'json'
+    if format not in ('json', 'csv'):
+        raise ValueError(f'Invalid stats export format: {format!r} (expected "json" or "csv")')
+
+    if isinstance(file, (str, Path)):
+        with open(file, 'w', newline='') as fp:
+            return export_stats(snapshot, fp, format)
+
+    if format == 'json':
+        json.dump(snapshot, file, indent=2)
+    else:
+        writer = csv.DictWriter(file, fieldnames=SNAPSHOT_FIELDS)
+        writer.writeheader()
+        writer.writerows(snapshot)
@@ -0,0 +1,37 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+CellRange = Tuple[int, int, int, int]  # (top, left, bottom, right) - inclusive
+
+
+def coalesce_cells(rows, cols) -> List[CellRange]:
+    """ Merges the given cells (parallel sequences of row and column indexes) into
+    rectangular ranges: first runs of consecutive rows within each column, then
+    runs of adjacent columns sharing the same rows.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    cols = np.asarray(cols, dtype=np.intp)
+    if not len(rows):
+        return []
+
+    # unique cells, sorted by column and then row
+    n_rows = int(rows.max()) + 1
+    keys = np.unique(cols * n_rows + rows)
+    cols, rows = np.divmod(keys, n_rows)
+
+    # runs of consecutive rows within the same column
+    starts = np.flatnonzero(np.r_[True, (np.diff(cols) != 0) | (np.diff(rows) != 1)])
+    ends = np.r_[starts[1:], len(rows)] - 1
+    seg_cols, seg_tops, seg_bottoms = cols[starts], rows[starts], rows[ends]
+
+    # runs of adjacent columns with identical row runs
+    order = np.lexsort((seg_cols, seg_bottoms, seg_tops))
+    seg_cols, seg_tops, seg_bottoms = seg_cols[order], seg_tops[order], seg_bottoms[order]
+    starts = np.flatnonzero(np.r_[True, (np.diff(seg_tops) != 0) | (np.diff(seg_bottoms) != 0)
+                                  | (np.diff(seg_cols) != 1)])
+    ends = np.r_[starts[1:], len(seg_cols)] - 1
+
+    return list(zip(seg_tops[starts].tolist(), seg_cols[starts].tolist(),
+                    seg_bottoms[starts].tolist(), seg_cols[ends].tolist()))
@@ -6,6 +6,8 @@ from qtpy.QtCore import QModelIndex
 def default_convert(item):
     return item
 
+_UNSET = object()  # sentinel for raw_item (None is a valid item)
+
 class TableContext:
     """
     Lazy evaluation of properties relative to the data request context.
@@ -23,6 +25,7 @@ class TableContext:
                  column_index: int,
                  column: "Column",
                  convert = default_convert,
+                 raw_item: Any = _UNSET,
                  ):
         self.__model = model
         self.index = index
@@ -30,6 +33,8 @@ class TableContext:
         self.column_index = column_index
         self.column = column
         self.convert = convert
+        if raw_item is not _UNSET:
+            self._raw_item = raw_item  # already known (e.g. picked in the GUI thread for a worker thread)
 
     @cached_property
     def row_index(self) -> int:
@@ -1,6 +1,6 @@
 from typing import Any, Dict
 
-from atom.api import Typed, ForwardTyped, List, Bool, observe, Event, Value, Enum
+from atom.api import Typed, ForwardTyped, List, Bool, observe, Event, Value, Enum, Int
 from atom.api import Dict as AtomDict
 from atom.atom import set_default
 from enaml.core.declarative import d_, d_func
@@ -49,6 +49,21 @@ class ProxyTable(ProxyControl):
     def set_selection_mode(self, selection_mode: str) -> None:
         raise NotImplementedError
 
+    def set_display_cache_size(self, display_cache_size: int) -> None:
+        raise NotImplementedError
+
+    def set_prefetch_margin(self, prefetch_margin: int) -> None:
+        raise NotImplementedError
+
+    def set_max_rows(self, max_rows: int) -> None:
+        raise NotImplementedError
+
+    def set_flash_duration_ms(self, flash_duration_ms: int) -> None:
+        raise NotImplementedError
+
+    def set_nan_position(self, nan_position: str) -> None:
+        raise NotImplementedError
+
 
 class Table(Control):
     """ A tabular grid/table, column-oriented, where individual items are
@@ -100,6 +115,23 @@ class Table(Control):
     # Selection mode and behaviour
     selection_mode = d_(Enum('cell', 'cells', 'row', 'rows'))
 
+    # Maximum number of formatted cells cached by the table model (0 disables caching)
+    display_cache_size = d_(Int())
+
+    # Rows around the visible ones whose cells are computed ahead in the background (0 disables prefetching) -
+    # the column getters, fmt and cell_style callbacks must then be safe to call from a worker thread, and the
+    # display strings are only kept with a display cache (see display_cache_size)
+    prefetch_margin = d_(Int())
+
+    # Maximum number of rows kept when rows are appended with append_items() - the oldest are dropped (0 for no limit)
+    max_rows = d_(Int())
+
+    # How long cells of DataFrame backed tables flash (fading out) after they change, in milliseconds (0 disables it)
+    flash_duration_ms = d_(Int())
+
+    # Where NaN values go when sorting: below any other value, or first/last whatever the sort order
+    nan_position = d_(Enum('smallest', 'first', 'last'))
+
     # Observers
 
     @observe("columns",
@@ -111,6 +143,11 @@ class Table(Control):
              "show_summary",
              "hints",
              "selection_mode",
+             "display_cache_size",
+             "prefetch_margin",
+             "max_rows",
+             "flash_duration_ms",
+             "nan_position",
              )
     def _update_proxy(self, change: Dict):
         """ An observer which sends state change to the proxy.
@@ -121,4 +158,11 @@ class Table(Control):
     @d_func
     def refresh(self) -> None:
         if self.initialized:
-            self.proxy.widget.refresh()
\ No newline at end of file
+            self.proxy.widget.refresh()
+
+    @d_func
+    def append_items(self, items) -> None:
+        """ Appends rows without resetting the table (keeping scroll position and selection).
+        """
+        if self.initialized:
+            self.proxy.widget.append_items(items)
\ No newline at end of file
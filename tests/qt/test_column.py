@@ -2,6 +2,7 @@ from collections import namedtuple
 from dataclasses import dataclass
 from decimal import Decimal
 
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -159,3 +160,279 @@ def test_generate_columns_exclude(items, exclude, hints):
 
     assert_column(col_1, 'Symbol', Alignment.LEFT)
     assert_column(col_2, 'Currency', Alignment.LEFT)
+
+
+@pytest.mark.parametrize('fmt', ['', ',.2f', '.3f', '08.1e', 'g', '+.1f', ','])
+def test_format_values_matches_format(fmt):
+    import numpy as np
+    from enamlext.qt.qt_dataframe import format_values
+
+    floats = np.array([0.0, -1.005, 2.5, 1234567.891, np.nan, np.inf])
+    ints = np.array([0, -7, 1234567])
+    objects = np.array([1.5, None, 'x' if fmt == '' else 3], dtype=object)
+
+    for values in (floats, ints, objects):
+        expected = [format(v, fmt) if v is not None else '' for v in values]
+        assert expected == format_values(values, fmt)
+
+
+def test_auto_align_from_dataframe_dtypes():
+    from enamlext.qt.table.column import AUTO_ALIGN
+
+    df = pd.DataFrame({'when': pd.to_datetime(['2024-01-01']), 'qty': [1], 'name': ['x']})
+    proxy = DataFrameProxy(df)
+    columns = generate_columns(proxy, hints={name: {'align': AUTO_ALIGN} for name in df.columns})
+
+    assert [c.infer_align(proxy) for c in columns] == [Alignment.CENTER, Alignment.RIGHT, Alignment.LEFT]
+
+
+def test_dataframe_proxy_convert_item():
+    proxy = DataFrameProxy(df)
+    row = proxy.convert_item(proxy[1])
+
+    assert row['price'] == 12.0
+    assert row.get('missing') is None
+    assert list(row) == ['symbol', 'price', 'currency']
+    assert row == {'symbol': 'B', 'price': 12.0, 'currency': 'GBP'}
+
+
+def test_dataframe_proxy_keeps_columns_native():
+    import numpy as np
+
+    frame = pd.DataFrame({'symbol': ['A', 'B'], 'price': [1.0, 2.0], 'qty': [1, 2],
+                          'when': pd.to_datetime(['2024-01-01', '2024-01-02'])})
+    proxy = DataFrameProxy(frame)
+    assert [column.dtype.kind for column in proxy.column_values] == ['O', 'f', 'i', 'O']
+    assert np.shares_memory(proxy.column_values[1], frame['price'].to_numpy())  # no copy of the frame
+    assert proxy[1][3] == pd.Timestamp('2024-01-02') and list(proxy[0]) == ['A', 1.0, 1, pd.Timestamp('2024-01-01')]
+
+    # updates are written per column (into a copy made on the first one), upcasting only when they do not fit
+    proxy = DataFrameProxy(frame, refresh_cells_callback=lambda rows, cols: None)
+    assert np.shares_memory(proxy.column_values[1], frame['price'].to_numpy())
+    row = proxy[0]
+    proxy.update_cells(np.array([0, 0, 1]), np.array([1, 2, 2]), np.array([1.5, 2.5, 3], dtype=object))
+    assert (row[1], row[2], proxy[1][2]) == (1.5, 2.5, 3)
+    new_values = frame.to_numpy()
+    new_values[1, 1] = 4.0
+    proxy.update_values_and_refresh_cells(new_values, [1], [1])  # (all the values, changed rows, changed columns)
+    assert proxy[1][1] == 4.0 and row[1] == 1.5
+    assert proxy.column_values[1].dtype == np.float64 and proxy.column_values[2].dtype == np.float64
+    assert frame['price'].tolist() == [1.0, 2.0] and frame['qty'].tolist() == [1, 2]
+
+
+def test_frame_change_detector_per_dtype():
+    import numpy as np
+    from enamlext.qt.qt_dataframe import FrameChangeDetector
+
+    frame = pd.DataFrame({
+        'price': [1.0, np.nan, 3.0],
+        'qty': [1, 2, 3],
+        'name': ['a', None, 'c'],
+        'when': pd.to_datetime(['2024-01-01', None, '2024-01-03']),
+        'side': pd.Categorical(['buy', 'sell', 'buy']),
+    })
+    detector = FrameChangeDetector(frame)
+    rows, cols, values = detector.detect()
+    assert len(rows) == 0  # NaN/None/NaT compare equal to themselves
+
+    frame.loc[0, 'price'] = 1.5
+    frame.loc[2, 'qty'] = 30
+    frame.loc[1, 'name'] = 'b'
+    frame.loc[1, 'when'] = pd.Timestamp('2024-01-02')
+    frame.loc[0, 'side'] = 'sell'
+    rows, cols, values = detector.detect()
+
+    changes = {(r, c): v for r, c, v in zip(rows.tolist(), cols.tolist(), values)}
+    assert changes == {(0, 0): 1.5, (2, 1): 30, (1, 2): 'b', (1, 3): pd.Timestamp('2024-01-02'), (0, 4): 'sell'}
+    assert len(detector.detect()[0]) == 0
+
+
+def test_frame_change_detector_reuses_its_buffers():
+    import numpy as np
+    from enamlext.qt.qt_dataframe import FrameChangeDetector
+
+    frame = pd.DataFrame({'bid': [1.0, 2.0], 'ask': [1.5, np.nan], 'side': pd.Categorical(['buy', 'sell'])})
+    detector = FrameChangeDetector(frame)
+    buffers = {id(buffer) for group in detector.groups for buffer in (group.front, group.back, group.mask)}
+
+    for tick in range(3):
+        frame.loc[tick % 2, 'bid'] += 1
+        rows, cols, values = detector.detect()
+        assert (rows.tolist(), cols.tolist(), values.tolist()) == ([tick % 2], [0], [frame.iloc[tick % 2, 0]])
+    assert buffers == {id(buffer) for group in detector.groups for buffer in (group.front, group.back, group.mask)}
+
+    # reordered categories: the codes are not comparable anymore, every cell of the column is reported
+    frame['side'] = frame['side'].cat.reorder_categories(['sell', 'buy'])
+    rows, cols, values = detector.detect()
+    assert (rows.tolist(), cols.tolist(), values.tolist()) == ([0, 1], [2, 2], ['buy', 'sell'])
+    assert len(detector.detect()[0]) == 0
+
+
+def test_cell_updates_are_conflated_per_cell():
+    import numpy as np
+    from enamlext.qt.qt_dataframe import CellUpdates
+
+    updates = CellUpdates(n_columns=3)
+    assert updates.put(np.array([0, 1]), np.array([2, 0]), np.array([1.0, 2.0]))
+    assert not updates.put(np.array([0, 0]), np.array([2, 2]), np.array(['x', 'y'], dtype=object))
+    assert len(updates) == 4
+
+    rows, cols, values = updates.take()
+    assert list(zip(rows.tolist(), cols.tolist(), values.tolist())) == [(0, 2, 'y'), (1, 0, 2.0)]
+    assert len(updates) == 0 and len(updates.take()[0]) == 0
+
+
+def test_dataframe_proxy_apply_updates(qtbot):
+    import threading
+
+    frame = df.copy()
+    refreshed = []
+    proxy = DataFrameProxy(frame, refresh_cells_callback=lambda rows, cols: refreshed.append(
+        threading.current_thread() is threading.main_thread()))
+
+    producer = threading.Thread(target=proxy.apply_updates, args=([0, 1], [1, 1], [11.0, 13.0]))
+    producer.start()
+    producer.join()
+    qtbot.waitUntil(lambda: len(refreshed) == 1)
+    proxy.apply_updates_by_label([1], ['currency'], ['USD'])
+    qtbot.waitUntil(lambda: len(refreshed) == 2)
+
+    assert proxy[0][1] == 11.0 and list(proxy[1]) == ['B', 13.0, 'USD']
+    assert frame.loc[0, 'price'] == 10.25  # the DataFrame itself is left alone
+    assert refreshed == [True, True]  # applied in the GUI thread
+
+    with pytest.raises(IndexError):
+        proxy.apply_updates([2], [0], ['C'])
+    with pytest.raises(KeyError):
+        proxy.apply_updates_by_label([0], ['volume'], [1])
+
+
+def test_dataframe_proxy_reloads_when_the_frame_changes_shape():
+    from enamlext.qt.qt_dataframe import FrameChangeDetector, TickScheduler
+
+    class HeldDeliveries(TickScheduler):
+        def schedule_delivery(self, df_proxy):
+            pass  # delivered below, by hand
+
+    scheduler = HeldDeliveries()
+    frame = pd.DataFrame({'price': [1.0, 2.0]})
+    resets = []
+    proxy = DataFrameProxy(frame, refresh_cells_callback=lambda rows, cols: None, scheduler=scheduler,
+                           structure_changed_callback=lambda: resets.append(len(proxy)))
+    detector = FrameChangeDetector(frame)
+
+    frame.loc[2] = 3.0
+    scheduler._tick(proxy, detector)
+    proxy._deliver_updates()
+    assert resets == [3] and proxy[2][0] == 3.0
+
+    frame.loc[2, 'price'] = 4.0  # ticks again, in the new structure
+    scheduler._tick(proxy, detector)
+    proxy._deliver_updates()
+    assert proxy[2][0] == 4.0
+
+
+def test_tick_pacer_adapts_interval_within_max_staleness():
+    import time
+    from enamlext.qt.qt_dataframe import TickPacer
+
+    pacer = TickPacer(interval_ms=100, max_staleness_ms=1_000)
+    assert pacer.interval == 0.1
+
+    pacer.record_delivery(time.perf_counter(), apply_time=0.2)  # main thread is struggling
+    assert 0.1 < pacer.interval <= 1.0
+
+    for _ in range(50):
+        pacer.record_delivery(time.perf_counter(), apply_time=2.0)  # way slower than the staleness allows
+    assert pacer.interval <= 1.0
+
+    for _ in range(100):
+        pacer.record_delivery(time.perf_counter(), apply_time=0.001)  # caught up
+    assert pacer.interval == pytest.approx(0.1)
+
+    pacer = TickPacer(interval_ms=2_000, max_staleness_ms=1_000)  # clamped to the requested interval
+    pacer.record_delivery(time.perf_counter(), apply_time=2.0)
+    assert pacer.interval == 2.0
+
+    pacer = TickPacer(interval_ms=100)  # no bound by default
+    pacer.record_delivery(time.perf_counter(), apply_time=2.0)
+    assert pacer.interval == pytest.approx(4.0)
+
+
+def test_tick_scheduler_polls_all_proxies_from_one_thread(qtbot):
+    import threading
+    import time
+    from enamlext.qt.qt_dataframe import TickScheduler
+
+    scheduler = TickScheduler()
+    frames = [df.copy() for _ in range(3)]
+    refreshed = {i: threading.Event() for i in range(len(frames))}
+    threads = set()
+
+    def callback(i):
+        def refresh(rows, cols):
+            threads.add(threading.current_thread().name)
+            refreshed[i].set()
+        return refresh
+
+    proxies = [DataFrameProxy(frame, tick_interval_ms=10, refresh_cells_callback=callback(i), scheduler=scheduler)
+               for i, frame in enumerate(frames)]
+    for frame in frames:
+        frame.loc[0, 'price'] = 99.0
+
+    qtbot.waitUntil(lambda: all(event.is_set() for event in refreshed.values()), timeout=2_000)
+    assert threads == {threading.main_thread().name}  # diffed in the scheduler thread, applied in the GUI one
+    assert all(proxy[0][1] == 99.0 for proxy in proxies)
+    assert set(scheduler.rates()) == set(proxies)
+    assert all(rate > 0 for rate in scheduler.rates().values())
+
+    for proxy in proxies:
+        proxy.deactivate()
+    assert not scheduler.rates()
+    time.sleep(0.05)
+    assert scheduler._thread is None
+
+
+def test_dataframe_proxy_tick_metrics():
+    from enamlext.qt.qt_dataframe import TickScheduler
+    from enamlext.qt.table.metrics import summarize
+
+    assert summarize([]) == {}
+    assert summarize([3.0, 1.0, 2.0]) == {'last': 2.0, 'mean': 2.0, 'p50': 2.0, 'p90': 3.0, 'p99': 3.0}
+
+    class HeldDeliveries(TickScheduler):
+        def schedule_delivery(self, df_proxy):
+            pass  # delivered below, by hand
+
+    proxy = DataFrameProxy(df.copy(), refresh_cells_callback=lambda rows, cols: None, scheduler=HeldDeliveries())
+    changes = []
+    proxy.metrics.observe('cells_per_tick', lambda change: changes.append(change['value']))
+
+    proxy.apply_updates([0], [1], [1.0])
+    proxy.apply_updates([0, 1], [1, 1], [2.0, 3.0])  # conflated with the previous one
+    proxy._deliver_updates()
+    proxy.record_repaint()
+    proxy._recorder.publish(force=True)
+
+    metrics = proxy.metrics
+    assert changes and metrics.cells_per_tick['last'] == 2
+    assert metrics.conflated_ticks == 1 and metrics.dropped_ticks == 0
+    assert metrics.ticks_per_second > 0
+    assert metrics.apply_time['p99'] >= 0 and metrics.latency['last'] > 0
+
+    proxy.apply_updates([0], [1], [4.0])
+    proxy.deactivate()
+    proxy._deliver_updates()
+    proxy._recorder.publish(force=True)
+    assert metrics.dropped_ticks == 1
+
+
+def test_dataframe_column_lookup():
+    from enamlext.qt.table.column import DataFrameColumnLookup
+
+    generated = generate_columns(DataFrameProxy(pd.DataFrame({'a': [1], 'b': [2], 'c': [3]})))
+    columns = [generated[2], Column('a', use_getitem=True), Column(lambda row: row[1]), Column(0, title='A again')]
+    lookup = DataFrameColumnLookup(columns, ['a', 'b', 'c'])
+
+    rows, cols = lookup.map_cells(np.array([5, 6, 7]), np.array([0, 1, 2]))
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(5, 1), (5, 3), (7, 0)]  # b is not mapped
@@ -1,9 +1,11 @@
+import threading
 from dataclasses import dataclass
 from typing import Any
 
+import numpy as np
 import pytest
 
-from enamlext.qt.qtable import QTable, Qt, QModelIndex
+from enamlext.qt.qtable import QTable, Qt, QModelIndex, QPoint
 from enamlext.qt.table.column import Column, Alignment
 
 
@@ -51,3 +53,837 @@ def test_displayed_data_basic(table):
         table.items = items
 
     assert table.text(1, 0) == "Pam"
+
+
+def test_display_cache_avoids_reformatting(table):
+    calls = []
+
+    def fmt(value):
+        calls.append(value)
+        return f'<{value}>'
+
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True, fmt=fmt)]
+        table.items = [{'x': 1}, {'x': 2}]
+    table.display_cache_size = 100
+    calls.clear()
+
+    assert table.text(0, 0) == '<1>'
+    assert table.text(0, 0) == '<1>'
+    assert calls == [1]
+
+
+def test_display_cache_invalidation(table):
+    items = [{'x': 1}, {'x': 2}]
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True)]
+        table.items = items
+    table.display_cache_size = 100
+
+    assert table.text(0, 0) == '1'
+    assert table.text(1, 0) == '2'
+
+    # dataChanged drops just the refreshed cell
+    items[0]['x'] = 10
+    items[1]['x'] = 20
+    table.refresh_one_cell(0, 0)
+    assert table.text(0, 0) == '10'
+    assert table.text(1, 0) == '2'
+
+    # setting new items resets the model (and the cache)
+    table.items = [{'x': 3}]
+    assert table.text(0, 0) == '3'
+
+
+def test_display_cache_is_bounded():
+    from enamlext.qt.table.cache import CellCache
+
+    cache = CellCache(2)
+    cache.put((0, 0), 'a')
+    cache.put((1, 0), 'b')
+    cache.get((0, 0))  # (1, 0) is now the least recently used
+    cache.put((2, 0), 'c')
+
+    assert (0, 0) in cache
+    assert (1, 0) not in cache
+    assert len(cache) == 2
+
+    cache.invalidate_range(0, 0, 5, 0)
+    assert len(cache) == 0
+
+
+def test_cell_style_resolved_once_per_cell(table):
+    from qtpy.QtGui import QColor
+
+    calls = []
+
+    def cell_style(tc):
+        calls.append(tc.row_index)
+        return {'color': QColor('red'), 'background': QColor('blue'), 'font': 'bold'}
+
+    items = [{'x': 1}, {'x': 2}]
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True, cell_style=cell_style)]
+        table.items = items
+    table.refresh()
+    calls.clear()
+
+    for role in (Qt.FontRole, Qt.ForegroundRole, Qt.BackgroundColorRole):
+        table.data(0, 0, role)
+    assert table.data(0, 0, Qt.ForegroundRole) == QColor('red')
+    assert table.data(0, 0, Qt.BackgroundColorRole) == QColor('blue')
+    assert table.data(0, 0, Qt.FontRole).bold()
+    assert calls == [0]
+
+    table.refresh_one_cell(0, 0)
+    table.data(0, 0, Qt.ForegroundRole)
+    assert calls == [0, 0]
+
+
+def test_cell_style_follows_the_other_columns_of_its_row(table):
+    from qtpy.QtGui import QColor
+
+    calls = []
+
+    def cell_style(tc):
+        calls.append(tc.row_index)
+        return {'color': QColor('red') if tc.item['limit'] < tc.item['x'] else QColor('black')}
+
+    items = [{'x': 1, 'limit': 2}]
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True, cell_style=cell_style), Column('limit', use_getitem=True)]
+        table.items = items
+    assert table.data(0, 0, Qt.ForegroundRole) == QColor('black')
+
+    items[0]['limit'] = 0
+    table.refresh_one_cell(0, 1)  # only the other column changed
+    assert table.data(0, 0, Qt.ForegroundRole) == QColor('red')
+
+    table.style_cache_size = 0  # resolved for every role
+    calls.clear()
+    table.data(0, 0, Qt.ForegroundRole)
+    table.data(0, 0, Qt.BackgroundColorRole)
+    assert calls == [0, 0]
+
+
+def test_image_column_decodes_off_thread_and_caches(table, qtbot, tmp_path):
+    from qtpy.QtGui import QPixmap
+
+    path = str(tmp_path / 'flag.png')
+    pixmap = QPixmap(48, 32)
+    pixmap.fill(Qt.green)
+    assert pixmap.save(path)
+
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True, image=path)]
+        table.items = [{'x': 1}]
+
+    loader = table.model()._image_loader
+    loader.clear()
+
+    with qtbot.waitSignal(table.model().dataChanged, timeout=5000):
+        placeholder = table.data(0, 0, Qt.DecorationRole)
+        assert placeholder is loader.placeholder
+
+    image = table.data(0, 0, Qt.DecorationRole)
+    assert (image.width(), image.height()) == (24, 16)
+    assert table.data(0, 0, Qt.DecorationRole) is image
+
+
+def test_image_loader_retries_failed_images_later(qtbot, tmp_path, monkeypatch):
+    from enamlext.qt.table import images
+
+    loader = images.ImageLoader()
+    path = str(tmp_path / 'missing.png')
+    with qtbot.waitSignal(loader.imageReady, timeout=5000):
+        loader.get(path)
+    assert loader.get(path) is None and not loader.is_pending(path)
+
+    monkeypatch.setattr(images, 'FAILED_IMAGE_RETRY_SECONDS', 0.0)
+    assert loader.get(path) is loader.placeholder
+    assert loader.is_pending(path)
+    loader.clear()
+    assert not loader.is_pending(path)
+    with qtbot.assertNotEmitted(loader.imageReady, wait=200):
+        pass  # the decode started before clear() is dropped
+
+
+def test_dataframe_columns_formatted_in_blocks(table):
+    import pandas as pd
+    from enamlext.qt.qt_dataframe import DataFrameProxy
+    from enamlext.qt.table.column import generate_columns
+
+    df = pd.DataFrame({'symbol': ['A', 'B', 'C'], 'price': [1234.5, -2.0, float('nan')]})
+    items = DataFrameProxy(df)
+    with table.updating_internals():
+        table.columns = generate_columns(items, hints={'price': {'fmt': ',.2f'}})
+        table.items = items
+
+    assert [table.text(i, 1) for i in range(3)] == ['1,234.50', '-2.00', 'nan']
+    assert [table.text(i, 0) for i in range(3)] == ['A', 'B', 'C']
+    assert (0, 1) in table.model()._format_blocks
+
+    table.model().sort(1, Qt.DescendingOrder)  # sorted views go through the per-cell path
+    assert [table.text(i, 1) for i in range(3)] == ['1,234.50', '-2.00', 'nan']
+
+
+def test_auto_align_is_inferred_once_per_column(table):
+    from enamlext.qt.table.column import MIXED_ALIGN
+
+    calls = []
+
+    def get_amount(item):
+        calls.append(item)
+        return item['amount']
+
+    items = [{'amount': None}, {'amount': 10}, {'amount': 'n/a'}]
+    with table.updating_internals():
+        table.columns = [Column(get_amount), Column(get_amount, align=MIXED_ALIGN)]
+        table.items = items
+    table.refresh()
+    calls.clear()
+
+    right = int(Qt.AlignRight | Qt.AlignVCenter)
+    left = int(Qt.AlignLeft | Qt.AlignVCenter)
+
+    assert [table.data(i, 0, Qt.TextAlignmentRole) for i in range(3)] == [right] * 3
+    assert len(calls) == 2  # sampled until the first non-null value, only once
+
+    assert [table.data(i, 1, Qt.TextAlignmentRole) for i in range(3)] == [left, right, left]
+
+    table.items = [{'amount': 'text'}]
+    assert table.data(0, 0, Qt.TextAlignmentRole) == left
+
+
+def test_role_dispatch_follows_columns_and_checkable(table):
+    @dataclass(frozen=True)
+    class Person:
+        name: str
+        age: int
+
+    items = [Person(name='John', age=33)]
+    with table.updating_internals():
+        table.columns = [Column('name', tooltip='The name'),
+                         Column('age', align=Alignment.RIGHT)]
+        table.items = items
+
+    assert table.text(0, 0) == 'John'
+    assert table.data(0, 0, Qt.ToolTipRole) == 'The name'
+    assert table.data(0, 1, Qt.ToolTipRole) == '33'
+    assert table.data(0, 1, Qt.DecorationRole) is None
+    assert table.data(0, 1, Qt.ForegroundRole) is None
+    assert table.data(0, 1, Qt.TextAlignmentRole) == int(Qt.AlignRight | Qt.AlignVCenter)
+    assert table.model().data(QModelIndex(), Qt.DisplayRole) is None  # not the last column
+
+    table.checkable = True
+    assert table.data(0, 0, Qt.CheckStateRole) == Qt.Unchecked
+    assert table.text(0, 0) is None
+    assert table.text(0, 1) == 'John'
+    assert table.text(0, 2) == '33'
+
+
+def test_profiling_columns(table, tmp_path):
+    import csv
+    import json
+    import time
+
+    def slow_style(tc):
+        time.sleep(0.002)
+
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True, cell_style=slow_style, collect_stats=True),
+                         Column('y', use_getitem=True)]
+        table.items = [{'x': 1, 'y': 2}, {'x': 3, 'y': 4}]
+
+    model = table.model()
+    table.refresh()  # drop the styles cached while sizing the columns
+    model.reset_profiling()
+    for row in range(2):
+        table.data(row, 0, Qt.DisplayRole)
+        table.data(row, 0, Qt.ForegroundRole)
+        table.data(row, 1, Qt.DisplayRole)
+
+    snapshot = {(s['column'], s['role']): s for s in model.profiling_snapshot()}
+    assert set(snapshot) == {('X', 'display'), ('X', 'foreground')}
+
+    foreground = snapshot['X', 'foreground']
+    assert foreground['n_calls'] == 2
+    assert foreground['callback_time'] >= 0.004
+    assert foreground['framework_time'] == pytest.approx(foreground['cum_time'] - foreground['callback_time'])
+    assert foreground['p50'] <= foreground['p99'] <= foreground['max_time']
+    assert model.columns[0].total_cost() == pytest.approx(
+        foreground['cum_time'] + snapshot['X', 'display']['cum_time'])
+
+    model.export_profiling(tmp_path / 'stats.csv')
+    with open(tmp_path / 'stats.csv') as fp:
+        assert len(list(csv.DictReader(fp))) == 2
+
+    model.export_profiling(tmp_path / 'stats.json')
+    with open(tmp_path / 'stats.json') as fp:
+        assert len(json.load(fp)) == 2
+
+    model.reset_profiling()
+    assert model.profiling_snapshot() == []
+
+
+def test_collect_stats_can_be_turned_on_later(table):
+    def fmt(value):
+        return str(value)
+
+    column = Column('x', use_getitem=True, fmt=fmt)
+    with table.updating_internals():
+        table.columns = [column]
+        table.items = [{'x': 1}]
+    table.text(0, 0)
+    assert not column.stats
+
+    column.collect_stats = True
+    table.text(0, 0)
+    table.text(0, 0)
+    assert column.stats[Qt.DisplayRole]['n_calls'] == 2  # readable like a dict
+    assert dict(column.stats[Qt.DisplayRole])['callback_time'] > 0
+
+    column.collect_stats = False
+    table.text(0, 0)
+    assert column.stats[Qt.DisplayRole]['n_calls'] == 2
+    assert column.fmt is fmt
+    handler = table.model()._role_handlers[0][Qt.DisplayRole]
+    assert 'timed' not in getattr(handler, '__qualname__', '')  # no timing wrapper left on data()
+
+
+def test_prefetch_fills_caches_in_background(table, qtbot):
+    import threading
+
+    threads = set()
+
+    def fmt(value):
+        threads.add(threading.current_thread())
+        return f'#{value}'
+
+    def cell_style(tc):
+        return {'font': 'bold'} if tc.item['x'] >= 10 else None
+
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True, fmt=fmt, cell_style=cell_style)]
+        table.items = [{'x': i} for i in range(100)]
+    table.prefetch_margin = 10
+    assert table.display_cache_size == 0  # left to the user
+    table.prefetch_margin = 0  # prefetched explicitly below
+    table.display_cache_size = 1000
+    model = table.model()
+    table.refresh()
+    threads.clear()
+
+    with qtbot.waitSignal(model.prefetchFinished, timeout=5000):
+        model.prefetch(10, 29, 0, 0)
+
+    assert threading.main_thread() not in threads
+    threads.clear()
+    assert [table.text(row, 0) for row in range(10, 30)] == [f'#{row}' for row in range(10, 30)]
+    assert table.data(10, 0, Qt.FontRole).bold()
+    assert not threads  # served from the caches
+
+
+def test_prefetch_results_are_dropped_if_data_changed(table, qtbot):
+    with table.updating_internals():
+        table.columns = [Column('x', use_getitem=True)]
+        table.items = [{'x': i} for i in range(10)]
+    table.display_cache_size = 1000
+    model = table.model()
+    table.refresh()
+
+    with qtbot.assertNotEmitted(model.prefetchFinished, wait=200):
+        model.prefetch(0, 9, 0, 0)
+        table.refresh()
+
+    assert len(model._display_cache) == 0
+
+
+def test_coalesce_cells_into_ranges():
+    from enamlext.qt.table.ranges import coalesce_cells
+
+    # a 3x2 block, a duplicated cell and an isolated cell
+    rows = [0, 1, 2, 0, 1, 2, 1, 7]
+    cols = [3, 3, 3, 4, 4, 4, 4, 0]
+
+    assert sorted(coalesce_cells(rows, cols)) == [(0, 3, 2, 4), (7, 0, 7, 0)]
+    assert coalesce_cells([], []) == []
+
+
+def test_refresh_cells_emits_one_signal_per_range(table, qtbot):
+    with table.updating_internals():
+        table.columns = [Column(i, use_getitem=True) for i in range(5)]
+        table.items = [list(range(5)) for _ in range(1000)]
+
+    emitted = []
+    table.model().dataChanged.connect(lambda tl, br, roles=(): emitted.append((tl.row(), tl.column(),
+                                                                               br.row(), br.column())))
+    table.refresh_viewport_threshold = 2.0  # never
+
+    table.refresh_cells([500, 501, 502, 500, 501, 502, 900], [1, 1, 1, 2, 2, 2, 4])
+    assert sorted(emitted) == [(500, 1, 502, 2), (900, 4, 900, 4)]
+
+    emitted.clear()
+    table.max_refresh_ranges = 1
+    table.refresh_cells([500, 900], [1, 4])
+    assert emitted == [(500, 1, 900, 4)]
+
+
+def test_refresh_source_cells_follows_sorting_and_filtering(table):
+    items = [{'name': name, 'pnl': pnl} for name, pnl in [('a', 3), ('b', 1), ('c', 2), ('d', 5)]]
+    with table.updating_internals():
+        table.columns = [Column('name', use_getitem=True), Column('pnl', use_getitem=True)]
+        table.items = items
+    model = table.model()
+    model.set_filter(table.columns[0], '!= "c"')
+    model.sort(1, Qt.DescendingOrder)
+    assert [table.text(i, 0) for i in range(3)] == ['d', 'a', 'b']
+
+    layout_changes = []
+    model.layoutChanged.connect(lambda *args: layout_changes.append(1))
+    emitted = []
+    model.dataChanged.connect(lambda tl, br, roles=(): emitted.append((tl.row(), tl.column())))
+
+    table.selectRow(2)  # 'b'
+    items[1]['pnl'] = 10  # the tick moves 'b' to the top
+    table.refresh_source_cells([1], [1])
+    assert [table.text(i, 0) for i in range(3)] == ['b', 'd', 'a']
+    assert layout_changes == [1]
+    assert emitted == [(0, 1)]
+    assert table.currentIndex().row() == 0
+
+    emitted.clear()
+    items[2]['pnl'] = 7  # 'c' is filtered out
+    table.refresh_source_cells([2, 0], [1, 0])
+    assert emitted == [(2, 0)]
+    assert layout_changes == [1]
+
+
+def test_filtered_and_sorted_view_indexes_the_items(table):
+    items = [{'name': name, 'pnl': pnl} for name, pnl in [('a', 3), ('b', 1), ('c', 2), ('d', 5)]]
+    with table.updating_internals():
+        table.columns = [Column('name', use_getitem=True), Column('pnl', use_getitem=True)]
+        table.items = items
+    model = table.model()
+    model.set_filter(table.columns[0], '!= "c"')
+    model.sort(1, Qt.DescendingOrder)
+
+    view = model.items
+    assert not isinstance(view, list)  # the source rows of the view rows, not a copy of the items
+    assert model._view_to_source.tolist() == [3, 0, 1]
+    assert model._source_to_view.tolist() == [1, 2, -1, 0]
+    assert [item['name'] for item in view] == ['d', 'a', 'b']
+    assert view[0] is items[3] and view[-1] is items[1]
+    assert view[1:] == [items[0], items[1]]
+    with pytest.raises(IndexError):
+        view[3]
+
+    model.clear_filters()
+    assert model.items is items
+
+
+def test_append_items_keeps_at_most_max_rows(table):
+    with table.updating_internals():
+        table.columns = [Column('n', use_getitem=True)]
+        table.items = [{'n': i} for i in range(3)]
+    table.max_rows = 4
+    model = table.model()
+    signals = []
+    model.modelReset.connect(lambda: signals.append('reset'))
+    model.rowsInserted.connect(lambda parent, first, last: signals.append(('inserted', first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: signals.append(('removed', first, last)))
+    table.selectRow(2)
+
+    table.append_items([{'n': 3}, {'n': 4}])
+
+    assert [table.text(i, 0) for i in range(model.rowCount())] == ['1', '2', '3', '4']
+    assert signals == [('removed', 0, 0), ('inserted', 2, 3)]
+    assert table.currentIndex().row() == 1  # still on n=2
+
+
+def test_append_items_filters_and_sorts_new_rows_only(table):
+    calls = []
+
+    def get_n(item):
+        calls.append(item['n'])
+        return item['n']
+
+    with table.updating_internals():
+        table.columns = [Column(get_n)]
+        table.items = [{'n': n} for n in (5, 1, 8)]
+    model = table.model()
+    model.set_filter(table.columns[0], '< 10')
+    model.sort(0, Qt.AscendingOrder)
+    assert [table.text(i, 0) for i in range(3)] == ['1', '5', '8']
+
+    calls.clear()
+    table.append_items([{'n': 6}, {'n': 20}])
+    assert [table.text(i, 0) for i in range(model.rowCount())] == ['1', '5', '6', '8']
+    assert sorted(set(calls) - {1, 5, 8}) == [6, 20]
+
+    table.max_rows = 3  # drops the 3 oldest rows (5, 1 and 8) - 20 is still there, filtered out
+    table.append_items([{'n': 0}])
+    assert [table.text(i, 0) for i in range(model.rowCount())] == ['0', '6']
+
+
+def test_streaming_dataframe_proxy(table):
+    import pandas as pd
+    from enamlext.qt.qt_dataframe import StreamingDataFrameProxy, TickScheduler
+    from enamlext.qt.table.column import generate_columns
+
+    frame = pd.DataFrame({'id': ['a', 'b'], 'qty': [10.0, 20.0]})
+    items = StreamingDataFrameProxy(frame, max_rows=3)
+    with table.updating_internals():
+        table.columns = generate_columns(items)
+        table.items = items
+
+    items.apply_updates([1], [1], [21.0])
+    table.append_items(pd.DataFrame({'id': ['c', 'd'], 'qty': [30.0, 40.0]}, index=[2, 3]))
+    assert [table.text(i, 0) for i in range(3)] == ['b', 'c', 'd']
+    assert [table.text(i, 1) for i in range(3)] == ['21.0', '30.0', '40.0']
+
+    items.apply_updates_by_label([3], ['qty'], [42.0])  # the frame index labels are kept for each row
+    table.refresh()
+    assert table.text(2, 1) == '42.0'
+    assert len(items) == 3 and items.max_rows == 3
+
+    # updates queued before older rows are dropped still land on their row
+    class HeldDeliveries(TickScheduler):
+        def schedule_delivery(self, df_proxy):
+            pass  # delivered below, by hand
+
+    items.scheduler = HeldDeliveries()
+    items.apply_updates([1, 0], [1, 1], [31.0, 0.0])  # c, and b which is about to be dropped
+    table.append_items(pd.DataFrame({'id': ['e'], 'qty': [50.0]}, index=[4]))
+    items._deliver_updates()
+    assert [items[i][1] for i in range(3)] == [31.0, 42.0, 50.0]
+
+
+def test_streaming_dataframe_proxy_keeps_the_declared_dtypes(table):
+    import numpy as np
+    import pandas as pd
+    from enamlext.qt.qt_dataframe import StreamingDataFrameProxy
+
+    frame = pd.DataFrame({'id': ['a'], 'qty': [10]})
+    items = StreamingDataFrameProxy(frame, max_rows=3)
+    qty = items.column_values[1]
+    with pytest.raises(ValueError, match='qty'):
+        items.append(pd.DataFrame({'id': ['b'], 'qty': [np.nan]}, index=[1]))
+    with pytest.raises(ValueError, match='qty'):
+        items.apply_updates([0], [1], ['many'])
+    items.append(pd.DataFrame({'id': ['b'], 'qty': [20]}, index=[1]))
+    assert items.column_values[1] is qty and len(items) == 2  # the buffer was never reallocated
+
+    items = StreamingDataFrameProxy(frame, max_rows=3, dtypes={'qty': float})
+    qty = items.column_values[1]
+    items.append(pd.DataFrame({'id': ['b'], 'qty': [np.nan]}, index=[1]))
+    items.update_cells(np.array([0]), np.array([1]), np.array([1.5]))
+    assert items.column_values[1] is qty and qty.dtype == np.float64
+    assert [items[i][1] for i in range(2)][0] == 1.5 and np.isnan(items[1][1])
+
+
+def test_changed_cells_flash(table):
+    import numpy as np
+    import pandas as pd
+    from enamlext.qt.qt_dataframe import DataFrameProxy
+    from enamlext.qt.qtable import FLASH_COLORS
+    from enamlext.qt.table.column import generate_columns
+
+    items = DataFrameProxy(pd.DataFrame({'symbol': ['A', 'B'], 'price': [1.0, 2.0]}))
+    with table.updating_internals():
+        table.columns = generate_columns(items)
+        table.items = items
+    table.flash_duration_ms = 1_000
+    model = table.model()
+    assert not model.is_flashing()
+
+    items.apply_updates([0, 1], [1, 1], [0.5, 3.0])
+    table.refresh_cells([0, 1], [1, 1])
+
+    down, up = table.data(0, 1, Qt.BackgroundColorRole), table.data(1, 1, Qt.BackgroundColorRole)
+    assert down.rgb() == FLASH_COLORS[-1].rgb() and up.rgb() == FLASH_COLORS[1].rgb()
+    assert table.data(0, 0, Qt.BackgroundColorRole) is None
+    assert model.is_flashing() and table._flash_timer.isActive()
+    rows, cols = model.fading_cells(0, 1, 0, 1)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 1), (1, 1)]
+
+    items.change_times[:] -= 0.9  # almost faded out
+    assert table.data(1, 1, Qt.BackgroundColorRole).alpha() < up.alpha()
+    items.change_times[:] = items.last_change_time = -np.inf
+    assert table.data(1, 1, Qt.BackgroundColorRole) is None
+    table._repaint_fading_cells()
+    assert not table._flash_timer.isActive()
+
+
+def test_dataframe_proxy_sorted_natively(table):
+    import numpy as np
+    import pandas as pd
+    from enamlext.qt.qt_dataframe import DataFrameProxy
+    from enamlext.qt.table.column import generate_columns
+
+    frame = pd.DataFrame({'id': list('abcde'), 'pnl': [2.0, np.nan, 1.0, 2.0, 3.0]})
+    items = DataFrameProxy(frame, refresh_cells_callback=lambda rows, cols: None)
+    with table.updating_internals():
+        table.columns = generate_columns(items)
+        table.items = items
+    model = table.model()
+
+    model.sort(1, Qt.DescendingOrder)
+    assert not isinstance(model.items, list)  # the indexes of the rows, not a copy of them
+    assert isinstance(model._sort_keys, np.ndarray)
+    assert [table.text(i, 0) for i in range(5)] == ['e', 'a', 'd', 'c', 'b']  # equal keys keep their order
+
+    table.nan_position = 'first'
+    assert [table.text(i, 0) for i in range(5)] == ['b', 'e', 'a', 'd', 'c']
+    model.sort(1, Qt.AscendingOrder)
+    assert [table.text(i, 0) for i in range(5)] == ['b', 'c', 'a', 'd', 'e']
+    table.nan_position = 'last'
+    assert [table.text(i, 0) for i in range(5)] == ['c', 'a', 'd', 'e', 'b']
+
+    # ticks move the rows with a native sort again
+    table.selectRow(0)  # 'c'
+    items.update_cells(np.array([2]), np.array([1]), np.array([9.0]))
+    table.refresh_source_cells([2], [1])
+    assert [table.text(i, 0) for i in range(5)] == ['a', 'd', 'e', 'c', 'b']
+    assert table.currentIndex().row() == 3
+
+    with pytest.raises(ValueError):
+        table.nan_position = 'middle'
+
+
+@pytest.mark.parametrize('dtype, values', [
+    ('int64', [0, np.iinfo(np.int64).min, np.iinfo(np.int64).max, -1]),
+    ('uint64', [2 ** 63, 1, np.iinfo(np.uint64).max, 0]),
+    ('bool', [True, False, True, False]),
+])
+def test_native_sort_of_extreme_integers(table, dtype, values):
+    import pandas as pd
+    from enamlext.qt.qt_dataframe import DataFrameProxy
+    from enamlext.qt.table.column import generate_columns
+
+    items = DataFrameProxy(pd.DataFrame({'id': list('abcd'), 'n': np.array(values, dtype=dtype)}))
+    with table.updating_internals():
+        table.columns = generate_columns(items)
+        table.items = items
+    model = table.model()
+    expected = [items[i][0] for i in sorted(range(4), key=lambda i: values[i])]  # stable, like the native sort
+
+    model.sort(1, Qt.AscendingOrder)
+    assert isinstance(model._sort_keys, np.ndarray)
+    assert [table.text(i, 0) for i in range(4)] == expected
+    model.sort(1, Qt.DescendingOrder)
+    expected = [items[i][0] for i in sorted(range(4), key=lambda i: values[i], reverse=True)]
+    assert [table.text(i, 0) for i in range(4)] == expected
+
+
+def test_multi_column_sort_with_mixed_values(table, qtbot):
+    calls = []
+
+    def get_desk(item):
+        calls.append(item)
+        return item['desk']
+
+    items = [{'desk': desk, 'pnl': pnl} for desk, pnl in
+             [('b', 1), (None, 2), (3, float('nan')), ('b', None), ('a', 'x'), (3, 5)]]
+    with table.updating_internals():
+        table.columns = [Column(get_desk, title='Desk'), Column('pnl', title='PnL', use_getitem=True)]
+        table.items = items
+        table.sortable = True
+    model = table.model()
+
+    model.sort(0, Qt.AscendingOrder)  # numbers, then strings, missing values first
+    assert [table.text(i, 0) for i in range(6)] == ['', '3', '3', 'a', 'b', 'b']
+    assert model.headerData(0, Qt.Horizontal, Qt.DisplayRole) == 'Desk'
+
+    calls.clear()
+    header = table.horizontalHeader()
+    position = QPoint(header.sectionViewportPosition(1) + 2, 2)
+    qtbot.mouseClick(header.viewport(), Qt.LeftButton, Qt.ShiftModifier, position)
+    qtbot.mouseClick(header.viewport(), Qt.LeftButton, Qt.ShiftModifier, position)  # flips the order
+    assert calls == []  # the keys of the desk column are cached (and only displaying calls the getter)
+    assert model.sort_columns == [(0, Qt.AscendingOrder), (1, Qt.DescendingOrder)]
+    assert [(table.text(i, 0), table.text(i, 1)) for i in range(6)] == [
+        ('', '2'), ('3', '5'), ('3', 'nan'), ('a', 'x'), ('b', '1'), ('b', '')]
+    assert [model.headerData(i, Qt.Horizontal, Qt.DisplayRole) for i in range(2)] == ['Desk ▲1', 'PnL ▼2']
+    assert header.sortIndicatorSection() == 0
+
+    calls.clear()
+    items[0]['pnl'] = 'z'  # the changed rows move (their keys are refreshed)
+    table.refresh_source_cells([0], [1])
+    assert calls == []
+    assert [(table.text(i, 0), table.text(i, 1)) for i in range(6)][3:] == [('a', 'x'), ('b', 'z'), ('b', '')]
+
+
+def test_sort_of_unorderable_values(table):
+    import datetime
+    items = [{'value': value} for value in [
+        {'b': 1}, {1}, {'a': 2}, {1, 2}, {2}, datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc),
+        datetime.datetime(2024, 1, 3), datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)]]
+    with table.updating_internals():
+        table.columns = [Column('value', use_getitem=True)]
+        table.items = items
+        table.sortable = True
+    model = table.model()
+
+    model.sort(0, Qt.AscendingOrder)  # grouped by type, dicts and sets by their repr
+    assert model._view_to_source.tolist() == [6, 7, 5, 2, 0, 3, 1, 4]
+    model.sort(0, Qt.DescendingOrder)
+    assert model._view_to_source.tolist() == [4, 1, 3, 0, 2, 5, 7, 6]
+
+
+def test_background_sort_is_applied_when_done(table, qtbot):
+    release = threading.Event()
+
+    def get_name(item):
+        if threading.current_thread() is not threading.main_thread():
+            release.wait(5)  # keeps the first (background) sort running
+        return item['name']
+
+    items = [{'name': name, 'qty': qty} for name, qty in [('c', 2), ('a', 3), ('b', 1)]]
+    with table.updating_internals():
+        table.columns = [Column(get_name, title='Name'), Column(lambda item: str(item['qty']), title='Qty')]
+        table.items = items
+    model = table.model()
+    model.background_sort_min_rows = 2
+    table.setCurrentIndex(table.index(0, 1))
+
+    model.sort(0, Qt.AscendingOrder)
+    assert model.sorting_in_background
+    assert model.headerData(0, Qt.Horizontal, Qt.DisplayRole) == 'Name \u231b'
+    assert [table.text(i, 1) for i in range(3)] == ['2', '3', '1']  # the current order stays meanwhile
+
+    with qtbot.waitSignal(model.backgroundSortChanged) as blocker:
+        model.sort(1, Qt.DescendingOrder)  # cancels the first sort
+        release.set()
+    assert blocker.args == [False]
+    assert model.sort_columns == [(1, Qt.DescendingOrder)]
+    assert [table.text(i, 1) for i in range(3)] == ['3', '2', '1']
+    assert table.currentIndex().row() == 1  # still on qty 2
+    assert model.headerData(1, Qt.Horizontal, Qt.DisplayRole) == 'Qty'
+
+
+def test_background_sort_resorts_rows_changed_meanwhile(table, qtbot):
+    release = threading.Event()
+    worker_calls = []
+
+    def get_name(item):
+        if threading.current_thread() is not threading.main_thread():
+            worker_calls.append(item['name'])
+            release.wait(5)
+        return item['name']
+
+    items = [{'name': name} for name in 'cab']
+    with table.updating_internals():
+        table.columns = [Column(get_name, title='Name')]
+        table.items = items
+    model = table.model()
+    model.background_sort_min_rows = 2
+
+    model.sort(0, Qt.AscendingOrder)
+    assert model.sorting_in_background
+    items[1]['name'] = 'd'  # changed while the job runs: its keys are not thrown away
+    table.refresh_source_cells([1], [0])
+    with qtbot.waitSignal(model.backgroundSortChanged) as blocker:
+        release.set()
+    assert blocker.args == [False]
+    assert len(worker_calls) == 3  # not started over
+    assert [table.text(i, 0) for i in range(3)] == ['b', 'c', 'd']
+
+
+def test_sorting_again_after_refreshing_view_cells(table):
+    items = [{'n': n} for n in (3, 1, 2)]
+    with table.updating_internals():
+        table.columns = [Column('n', use_getitem=True)]
+        table.items = items
+    model = table.model()
+    model.sort(0, Qt.AscendingOrder)
+    assert [table.text(i, 0) for i in range(3)] == ['1', '2', '3']
+
+    items[0]['n'] = 0
+    table.refresh_one_cell(2, 0)  # view row of the first item
+    model.sort(0, Qt.DescendingOrder)
+    assert [table.text(i, 0) for i in range(3)] == ['2', '1', '0']
+
+    items[1]['n'] = 5
+    table.refresh_cells([1], [0])
+    model.sort(0, Qt.AscendingOrder)
+    assert [table.text(i, 0) for i in range(3)] == ['0', '2', '5']
+
+
+def test_assigning_overlapping_items_keeps_the_view(table):
+    orders = [{'id': i, 'qty': qty} for i, qty in enumerate([30, 10, 50, 20, 40])]
+    with table.updating_internals():
+        table.columns = [Column('id', use_getitem=True), Column('qty', use_getitem=True)]
+        table.items = orders
+    model = table.model()
+    model.sort(1, Qt.AscendingOrder)
+    table.selectRow(3)  # id 4 (qty 40)
+
+    resets, layout_changes = [], []
+    model.modelReset.connect(lambda: resets.append(1))
+    model.layoutChanged.connect(lambda *args: layout_changes.append(1))
+
+    orders[1]['qty'] = 45  # changed
+    refreshed = [orders[4], orders[1], orders[2], orders[0], {'id': 5, 'qty': 25}]  # id 3 is gone, id 5 is new
+    table.items = refreshed
+    assert [table.text(i, 0) for i in range(model.rowCount())] == ['5', '0', '4', '1', '2']
+    assert (resets, layout_changes) == ([], [1])
+    assert table.currentIndex().row() == 2 and table.verticalHeader().count() == 5
+
+    table.items = [{'id': i, 'qty': i} for i in range(3)]  # nothing in common: reset
+    assert resets and layout_changes == [1]
+    assert [table.text(i, 0) for i in range(model.rowCount())] == ['0', '1', '2']
+
+
+def test_widget_set_items_keeps_the_view(qtbot):
+    from enamlext.qt.qt_table import QtTable
+    from enamlext.widgets.table import Table
+
+    orders = [{'id': i} for i in range(5)]
+    declaration = Table(columns=[Column('id', use_getitem=True)], items=orders)
+    proxy = QtTable(declaration=declaration)
+    declaration.proxy = proxy
+    proxy.create_widget()
+    proxy.init_widget()
+    qtbot.addWidget(proxy.widget)
+    model = proxy.widget.model()
+    proxy.widget.setCurrentIndex(model.index(3, 0))
+    current_id = model.data(model.index(3, 0), Qt.DisplayRole)
+
+    resets = []
+    model.modelReset.connect(lambda: resets.append(1))
+    proxy.set_items(orders[1:] + [{'id': 5}])
+    assert resets == []
+    assert model.data(proxy.widget.currentIndex(), Qt.DisplayRole) == current_id
+
+
+def test_dataframe_widget_refreshes_the_cells_of_user_columns(qtbot):
+    import enaml
+    import numpy as np
+    import pandas as pd
+    import enamlext.widgets  # registers the Table proxy (before the application is created)
+    from enaml.qt.qt_application import QtApplication
+
+    QtApplication.instance() or QtApplication()
+    with enaml.imports():
+        from enamlext.widgets.dataframe import DataFrame
+
+    df = pd.DataFrame({'a': [1, 2], 'b': [10, 20], 'c': [100, 200]})
+    view = DataFrame(df=df, columns=[Column(2, title='C', use_getitem=True), Column(0, title='A', use_getitem=True)])
+    view.initialize()
+    view.activate_proxy()
+    qtbot.addWidget(view.proxy.widget)
+    model = view.proxy.widget.model()
+
+    changed = []
+    model.dataChanged.connect(lambda top_left, bottom_right, roles=(): changed.append(
+        (top_left.row(), top_left.column(), bottom_right.row(), bottom_right.column())))
+    view.items.update_cells(np.array([1, 0]), np.array([1, 2]), np.array([21, 101]))  # b is not displayed
+    assert len(changed) == 1
+    row, col = changed[0][:2]
+    assert col == 0 and model.data(model.index(row, col), Qt.DisplayRole) == '101'
+
+    view.columns = [Column(0, title='A', use_getitem=True), Column(2, title='C', use_getitem=True)]
+    changed.clear()
+    view.items.update_cells(np.array([0]), np.array([0]), np.array([5]))
+    assert [cell[1] for cell in changed] == [0]